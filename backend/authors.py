@@ -0,0 +1,69 @@
+"""
+Snapshot do autor gravado em posts, comentários e anúncios de hospedagem
+Evita juntar db.users na leitura; é reescrito em massa quando nome ou role mudam.
+"""
+
+import logging
+
+AUTHOR_FIELDS = ['name', 'display_name', 'use_display_name', 'role']
+
+# Coleções que guardam o snapshot em 'author', indexadas por 'user_id'
+AUTHORED_COLLECTIONS = ['posts', 'comments', 'housing_listings']
+
+
+def author_snapshot(user) -> dict:
+    """Snapshot a partir de um User (modelo) ou documento de usuário"""
+    data = user if isinstance(user, dict) else user.model_dump()
+    return {field: data.get(field) for field in AUTHOR_FIELDS}
+
+
+def author_stub(author: dict, use_display_name: bool = True) -> dict:
+    """Resumo exibido junto ao conteúdo: {name, role}"""
+    name = author.get('name')
+    if use_display_name and author.get('use_display_name') and author.get('display_name'):
+        name = author['display_name']
+    return {'name': name, 'role': author.get('role')}
+
+
+async def attach_authors(db, docs: list, use_display_name: bool = True) -> None:
+    """
+    Preenche doc['user'] a partir do snapshot.
+    Documentos antigos, sem snapshot, usam uma única consulta em lote em db.users.
+    """
+    missing_ids = list({
+        doc['user_id'] for doc in docs
+        if not doc.get('author') and doc.get('user_id') and doc['user_id'] != 'system'
+    })
+    users = {}
+    if missing_ids:
+        projection = {'_id': 0, 'id': 1, **{field: 1 for field in AUTHOR_FIELDS}}
+        async for user in db.users.find({'id': {'$in': missing_ids}}, projection):
+            users[user['id']] = user
+
+    for doc in docs:
+        author = doc.pop('author', None) or users.get(doc.get('user_id'))
+        if author:
+            doc['user'] = author_stub(author, use_display_name)
+
+
+async def fan_out_author_changes(db, user_id: str, changes: dict) -> None:
+    """Reescreve os snapshots do usuário em todas as coleções (tarefa em background)"""
+    update = {'$set': {f'author.{field}': value for field, value in changes.items() if field in AUTHOR_FIELDS}}
+    if not update['$set']:
+        return
+    for collection_name in AUTHORED_COLLECTIONS:
+        try:
+            await db[collection_name].update_many({'user_id': user_id, 'author': {'$exists': True}}, update)
+        except Exception as e:
+            logging.error(f"Author snapshot fan-out failed for '{collection_name}': {e}")
+
+    # Prévias de comentários guardadas nos posts (latest_comments)
+    try:
+        await db.posts.update_many(
+            {'latest_comments.user_id': user_id},
+            {'$set': {f'latest_comments.$[c].author.{field}': value for field, value in changes.items()
+                      if field in AUTHOR_FIELDS}},
+            array_filters=[{'c.user_id': user_id, 'c.author': {'$exists': True}}]
+        )
+    except Exception as e:
+        logging.error(f"Author snapshot fan-out failed for 'posts.latest_comments': {e}")
@@ -296,6 +296,43 @@ AUTO_RESPONSES = {
     }
 }
 
+# Mensagens automáticas guardam só a referência (template_id, template_version, language);
+# o texto é montado na leitura. Incrementar a versão ao editar o conteúdo de AUTO_RESPONSES.
+AUTO_RESPONSES_VERSION = 1
+AUTO_RESPONSES_LANGUAGE = 'pt'
+
+
+class AutoResponseCatalog:
+    """Textos das mensagens automáticas, compilados uma única vez na inicialização"""
+
+    def __init__(self, responses: dict = AUTO_RESPONSES, version: int = AUTO_RESPONSES_VERSION,
+                 language: str = AUTO_RESPONSES_LANGUAGE):
+        self.version = version
+        self.language = language
+        self._texts = {
+            (category, language): f"{response['title']}\n\n{response['content']}"
+            for category, response in responses.items()
+        }
+
+    def text(self, template_id: str, language: str = None) -> str:
+        return self._texts.get((template_id, language or self.language)) or self._texts.get((template_id, self.language))
+
+    def reference(self, category: str) -> dict:
+        """Campos gravados na mensagem no lugar do texto (None se não há resposta para a categoria)"""
+        if (category, self.language) not in self._texts:
+            return None
+        return {'template_id': category, 'template_version': self.version, 'language': self.language}
+
+    def render(self, message: dict) -> dict:
+        """
+        Preenche message['message'] a partir da referência (mensagens antigas já trazem o texto).
+        Só a versão atual dos textos existe no código: referências antigas mostram o texto atual.
+        """
+        if message.get('template_id') and not message.get('message'):
+            message['message'] = self.text(message['template_id'], message.get('language')) or ''
+        return message
+
+
 def get_auto_response(category: str) -> dict:
     """Retorna a resposta automática para uma categoria"""
     return AUTO_RESPONSES.get(category, None)
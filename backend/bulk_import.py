@@ -0,0 +1,177 @@
+"""
+Importação em massa de usuários (listas de ONGs parceiras)
+Aceita CSV ou NDJSON, gera os hashes bcrypt em paralelo num pool de processos
+e grava em lotes com insert_many(ordered=False), reportando erros por linha.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator
+
+import bcrypt
+from email_validator import EmailNotValidError, validate_email
+from pymongo.errors import BulkWriteError
+
+VALID_ROLES = ['migrant', 'volunteer', 'helper']
+LIST_FIELDS = ['languages', 'help_categories', 'need_categories']
+TEXT_FIELDS = ['email', 'password', 'name', 'role', 'phone', 'organization']
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    # Executado em outro processo: precisa ser uma função de módulo (picklable)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+
+
+def detect_format(filename: str = '', content_type: str = '') -> str:
+    if filename.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    return 'csv'
+
+
+def parse_rows(text: str, fmt: str) -> Iterator[dict]:
+    """Lê as linhas do arquivo; listas no CSV usam ';' como separador"""
+    if fmt == 'ndjson':
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield {'_parse_error': 'invalid_json'}
+    else:
+        for row in csv.DictReader(io.StringIO(text)):
+            for field in LIST_FIELDS:
+                if isinstance(row.get(field), str):
+                    row[field] = [v.strip() for v in row[field].split(';') if v.strip()]
+            yield row
+
+
+def normalize_email(email: str) -> str:
+    """
+    Mesma validação/normalização do EmailStr de /auth/register e /auth/login (domínio em minúsculas),
+    para o login e o índice único enxergarem o mesmo valor; ValueError se inválido
+    """
+    try:
+        return validate_email(email.strip(), check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        raise ValueError(str(e))
+
+
+def validate_row(row: dict) -> str:
+    """Retorna o código do erro ou '' se a linha é válida"""
+    # No NDJSON cada linha pode ser qualquer JSON (ex: [1, 2], 5, {"email": 5})
+    if not isinstance(row, dict):
+        return 'invalid_row'
+    if '_parse_error' in row:
+        return row['_parse_error']
+    for field in TEXT_FIELDS:
+        if row.get(field) is not None and not isinstance(row[field], str):
+            return 'invalid_field_type'
+    for field in LIST_FIELDS:
+        value = row.get(field)
+        if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+            return 'invalid_field_type'
+    try:
+        normalize_email(row.get('email') or '')
+    except ValueError:
+        return 'invalid_email'
+    if len(row.get('password') or '') < 6:
+        return 'invalid_password'
+    if not (row.get('name') or '').strip():
+        return 'missing_name'
+    if row.get('role') not in VALID_ROLES:
+        return 'invalid_role'
+    return ''
+
+
+def build_user_doc(row: dict, password_hash: str) -> dict:
+    """Monta o documento no mesmo formato gravado por /api/auth/register"""
+    user = {
+        'id': str(uuid.uuid4()),
+        'email': normalize_email(row['email']),
+        'name': row['name'].strip(),
+        'display_name': None,
+        'use_display_name': False,
+        'role': row['role'],
+        'location': None,
+        'bio': None,
+        'languages': row.get('languages') or [],
+        'categories': [],
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'password': password_hash,
+        'token_version': 0,
+        'show_location': False
+    }
+    if row['role'] in ['volunteer', 'helper']:
+        user['help_categories'] = row.get('help_categories') or []
+    if row['role'] == 'migrant':
+        user['need_categories'] = row.get('need_categories') or []
+    for field in ['phone', 'organization']:
+        if row.get(field):
+            user[field] = row[field]
+    return user
+
+
+async def import_users(db, rows: Iterator[dict], rounds: int = 12, batch_size: int = 500,
+                       max_workers: int = None) -> AsyncIterator[dict]:
+    """Importa os usuários e produz eventos de progresso e de erro por linha"""
+    loop = asyncio.get_running_loop()
+    totals = {'processed': 0, 'inserted': 0, 'failed': 0}
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        batch = []
+        row_number = 0
+        for row in rows:
+            row_number += 1
+            batch.append((row_number, row))
+            if len(batch) >= batch_size:
+                async for event in _import_batch(db, loop, pool, batch, rounds, totals):
+                    yield event
+                batch = []
+        if batch:
+            async for event in _import_batch(db, loop, pool, batch, rounds, totals):
+                yield event
+
+    yield {'event': 'done', **totals}
+
+
+async def _import_batch(db, loop, pool, batch, rounds, totals) -> AsyncIterator[dict]:
+    valid = []
+    for row_number, row in batch:
+        error = validate_row(row)
+        if error:
+            totals['failed'] += 1
+            email = row.get('email') if isinstance(row, dict) else None
+            yield {'event': 'error', 'row': row_number, 'email': email, 'error': error}
+        else:
+            valid.append((row_number, row))
+
+    hashes = await asyncio.gather(*[
+        loop.run_in_executor(pool, _hash_password, row['password'], rounds) for _, row in valid
+    ])
+    docs = [build_user_doc(row, password_hash) for (_, row), password_hash in zip(valid, hashes)]
+
+    inserted = len(docs)
+    if docs:
+        try:
+            await db.users.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            inserted -= len(write_errors)
+            for write_error in write_errors:
+                row_number, row = valid[write_error['index']]
+                error = 'duplicate_email' if write_error.get('code') == DUPLICATE_KEY_ERROR else 'write_error'
+                totals['failed'] += 1
+                yield {'event': 'error', 'row': row_number, 'email': row.get('email'), 'error': error}
+
+    totals['processed'] += len(batch)
+    totals['inserted'] += inserted
+    yield {'event': 'progress', **totals}
@@ -0,0 +1,73 @@
+"""
+Verifica via explain que as consultas quentes usam índices
+Falha (código 1) se alguma consulta de HOT_QUERIES usar COLLSCAN ou ordenação em memória (SORT)
+Uso: python check_indexes.py [--create]
+"""
+
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db_indexes import HOT_QUERIES, ensure_indexes
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('DB_NAME', 'test_database')
+
+FORBIDDEN_STAGES = {'COLLSCAN', 'SORT'}
+
+
+def plan_stages(plan) -> set:
+    """Coleta os estágios do plano vencedor (formato clássico e SBE)"""
+    stages = set()
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.add(plan['stage'])
+        for value in plan.values():
+            stages |= plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages |= plan_stages(item)
+    return stages
+
+
+async def explain_query(db, query: dict) -> set:
+    cursor = db[query['collection']].find(query['filter'])
+    if query.get('sort'):
+        cursor = cursor.sort(query['sort'])
+    explain = await cursor.explain()
+    return plan_stages(explain['queryPlanner']['winningPlan'])
+
+
+async def main(create: bool) -> int:
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+    try:
+        if create:
+            await ensure_indexes(db)
+
+        failures = 0
+        for query in HOT_QUERIES:
+            stages = await explain_query(db, query)
+            bad_stages = stages & FORBIDDEN_STAGES
+            if bad_stages:
+                failures += 1
+                print(f"❌ {query['name']}: {', '.join(sorted(bad_stages))}")
+            else:
+                print(f"✅ {query['name']}")
+
+        print()
+        print(f"{len(HOT_QUERIES) - failures}/{len(HOT_QUERIES)} consultas usando índices")
+        return 1 if failures else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main('--create' in sys.argv)))
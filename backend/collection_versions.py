@@ -0,0 +1,66 @@
+"""
+Versões por coleção para GET condicional (ETag / If-None-Match)
+Cada escrita incrementa a versão no MongoDB; o worker mantém uma cópia em memória,
+atualizada na hora para as próprias escritas e recarregada periodicamente para as dos outros workers.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+
+from pymongo import ReturnDocument
+
+
+class CollectionVersions:
+    def __init__(self, refresh_seconds: float = 2.0):
+        self.refresh_seconds = refresh_seconds
+        self._versions = {}
+        self._task = None
+
+    def get(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    async def bump(self, db, *names: str) -> None:
+        """Chamar após cada escrita que altera o conteúdo listado da coleção"""
+        for name in names:
+            doc = await db.collection_versions.find_one_and_update(
+                {'_id': name},
+                {'$inc': {'version': 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self._versions[name] = max(doc['version'], self.get(name))
+
+    async def load(self, db) -> None:
+        async for doc in db.collection_versions.find({}):
+            self._versions[doc['_id']] = max(doc['version'], self.get(doc['_id']))
+
+    async def _refresh_loop(self, db) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.load(db)
+            except Exception as e:
+                logging.error(f"Collection versions refresh error: {e}")
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(db))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def etag(self, names: list, *parts) -> str:
+        """ETag fraco derivado das versões das coleções e dos parâmetros da consulta"""
+        key = json.dumps([[self.get(name) for name in names], parts], sort_keys=True, default=str)
+        return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+    @staticmethod
+    def matches(if_none_match: str, etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidates = [value.strip() for value in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates
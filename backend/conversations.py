@@ -0,0 +1,60 @@
+"""
+Caixa de entrada materializada (db.conversations): um documento por (user_id, partner_id)
+com a última mensagem (prévia), o horário dela, o da última mensagem recebida (last_received_at)
+e quantas mensagens o usuário ainda não leu.
+Atualizada a cada mensagem gravada, para que /api/conversations seja uma única consulta indexada.
+"""
+
+from pymongo import UpdateOne
+
+# Tamanho máximo do texto guardado como prévia
+PREVIEW_LENGTH = 200
+
+# Campos da mensagem copiados para last_message (texto ou referência ao template)
+PREVIEW_FIELDS = ['id', 'from_user_id', 'template_id', 'template_version', 'language', 'created_at']
+
+
+# Mensagens antigas que ainda precisam de conversation_id; sem as duas pontas não há par para gravar
+LEGACY_MESSAGES_FILTER = {
+    'conversation_id': None,
+    'from_user_id': {'$type': 'string'},
+    'to_user_id': {'$type': 'string'}
+}
+
+
+def conversation_id(user_a: str, user_b: str) -> str:
+    """Identificador canônico da conversa: o par de ids em ordem, igual para as duas pontas"""
+    return ':'.join(sorted([user_a, user_b]))
+
+
+def message_preview(message: dict) -> dict:
+    preview = {field: message[field] for field in PREVIEW_FIELDS if message.get(field) is not None}
+    if message.get('message'):
+        preview['message'] = message['message'][:PREVIEW_LENGTH]
+    return preview
+
+
+def _conversation_update(user_id: str, partner_id: str, message: dict, unread: int) -> UpdateOne:
+    # Pipeline: mensagens gravadas fora de ordem não sobrescrevem uma prévia mais recente
+    is_newer = {'$gte': [message['created_at'], {'$ifNull': ['$last_message_at', '']}]}
+    fields = {
+        'last_message': {'$cond': [is_newer, {'$literal': message_preview(message)}, '$last_message']},
+        'last_message_at': {'$cond': [is_newer, message['created_at'], '$last_message_at']},
+        'unread_count': {'$add': [{'$ifNull': ['$unread_count', 0]}, unread]}
+    }
+    if unread:
+        # Só mensagens recebidas: a resposta do próprio usuário não deve impedir que a leitura zere o contador
+        fields['last_received_at'] = {'$max': [{'$ifNull': ['$last_received_at', '']}, message['created_at']]}
+    return UpdateOne({'user_id': user_id, 'partner_id': partner_id}, [{'$set': fields}], upsert=True)
+
+
+async def record_messages(db, messages: list) -> None:
+    """Atualiza as duas pontas de cada conversa (o remetente 'system' não tem caixa de entrada)"""
+    operations = []
+    for message in messages:
+        sender, recipient = message['from_user_id'], message['to_user_id']
+        if sender != 'system':
+            operations.append(_conversation_update(sender, recipient, message, 0))
+        operations.append(_conversation_update(recipient, sender, message, 1))
+    if operations:
+        await db.conversations.bulk_write(operations)
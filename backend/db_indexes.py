@@ -0,0 +1,127 @@
+"""
+Índices do MongoDB criados na inicialização do servidor
+create_indexes é idempotente: índices já existentes com a mesma definição são ignorados.
+HOT_QUERIES lista as consultas quentes que check_indexes.py valida via explain.
+"""
+
+import logging
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, TEXT, IndexModel
+
+INDEXES = {
+    'users': [
+        # Usuários criados por scripts antigos (create_admin.py) não têm 'id'
+        IndexModel([('id', ASCENDING)], name='users_id_unique', unique=True,
+                   partialFilterExpression={'id': {'$exists': True}}),
+        IndexModel([('email', ASCENDING)], name='users_email_unique', unique=True),
+    ],
+    'posts': [
+        IndexModel([('id', ASCENDING)], name='posts_id_unique', unique=True),
+        # Feed paginado por cursor: sort (created_at, id) desc
+        IndexModel([('created_at', DESCENDING), ('id', DESCENDING)], name='posts_created_at_id'),
+        # Feed filtrado por tipo
+        IndexModel([('type', ASCENDING), ('created_at', DESCENDING), ('id', DESCENDING)],
+                   name='posts_type_created_at_id'),
+        # Feed filtrado por categoria: cada ramo do $or (category | categories) tem seu índice
+        IndexModel([('category', ASCENDING), ('created_at', DESCENDING), ('id', DESCENDING)],
+                   name='posts_category_created_at_id'),
+        IndexModel([('categories', ASCENDING), ('created_at', DESCENDING), ('id', DESCENDING)],
+                   name='posts_categories_created_at_id'),
+        # can_chat_with_user
+        IndexModel([('user_id', ASCENDING), ('type', ASCENDING)], name='posts_user_id_type'),
+        # auto_post_jobs
+        IndexModel([('job_id', ASCENDING)], name='posts_job_id'),
+        # Fan-out do snapshot do autor nas prévias de comentários
+        IndexModel([('latest_comments.user_id', ASCENDING)], name='posts_latest_comments_user_id'),
+        # Feed por proximidade (lat/lng/radius_km)
+        IndexModel([('geo', GEOSPHERE)], name='posts_geo'),
+        # /posts/search: sem stemming ('none') para servir igualmente pt/fr/en;
+        # o índice de texto v3 já ignora acentos e maiúsculas
+        IndexModel([('title', TEXT), ('description', TEXT)], name='posts_text',
+                   weights={'title': 3, 'description': 1},
+                   default_language='none', language_override='text_language'),
+    ],
+    'comments': [
+        # Fan-out do snapshot do autor
+        IndexModel([('user_id', ASCENDING)], name='comments_user_id'),
+        # Comentários de um post paginados por (created_at, id)
+        IndexModel([('post_id', ASCENDING), ('created_at', ASCENDING), ('id', ASCENDING)],
+                   name='comments_post_id_created_at_id'),
+    ],
+    'housing_listings': [
+        IndexModel([('user_id', ASCENDING)], name='housing_listings_user_id'),
+    ],
+    'token_revocations': [
+        IndexModel([('user_id', ASCENDING)], name='token_revocations_user_id_unique', unique=True),
+    ],
+    'messages': [
+        # Histórico de uma conversa: uma varredura de intervalo por (created_at, id)
+        IndexModel([('conversation_id', ASCENDING), ('created_at', ASCENDING), ('id', ASCENDING)],
+                   name='messages_conversation_id_created_at_id'),
+    ],
+    'conversations': [
+        IndexModel([('user_id', ASCENDING), ('partner_id', ASCENDING)],
+                   name='conversations_user_id_partner_id_unique', unique=True),
+        # Caixa de entrada paginada por (last_message_at, partner_id) desc
+        IndexModel([('user_id', ASCENDING), ('last_message_at', DESCENDING), ('partner_id', DESCENDING)],
+                   name='conversations_user_id_last_message_at'),
+        # Exclusão de usuário
+        IndexModel([('partner_id', ASCENDING)], name='conversations_partner_id'),
+        # /messages/unread-count: só conversas com mensagens não lidas entram no índice
+        IndexModel([('user_id', ASCENDING)], name='conversations_user_id_unread',
+                   partialFilterExpression={'unread_count': {'$gt': 0}}),
+    ],
+    'realtime_events': [
+        # Eventos só interessam aos change streams abertos: expiram após 1 hora
+        IndexModel([('created_at', ASCENDING)], name='realtime_events_ttl', expireAfterSeconds=3600),
+    ],
+}
+
+
+FEED_SORT = [('created_at', DESCENDING), ('id', DESCENDING)]
+
+# Coleções cujos índices únicos sustentam regras da API (o cadastro não consulta o email antes
+# do insert e depende de users_email_unique): sem eles o servidor não deve subir.
+# Emails duplicados já gravados impedem a criação do índice e precisam ser resolvidos antes.
+REQUIRED_INDEX_COLLECTIONS = {'users'}
+
+HOT_QUERIES = [
+    {'name': 'auth: user by id', 'collection': 'users', 'filter': {'id': 'x'}},
+    {'name': 'auth: user by email', 'collection': 'users', 'filter': {'email': 'x@example.com'}},
+    {'name': 'feed', 'collection': 'posts', 'filter': {}, 'sort': FEED_SORT},
+    {'name': 'feed next page', 'collection': 'posts', 'sort': FEED_SORT, 'filter': {'$or': [
+        {'created_at': {'$lt': '2024-01-01T00:00:00+00:00'}},
+        {'created_at': '2024-01-01T00:00:00+00:00', 'id': {'$lt': 'x'}}
+    ]}},
+    {'name': 'feed by type', 'collection': 'posts', 'filter': {'type': 'need'}, 'sort': FEED_SORT},
+    {'name': 'feed by category', 'collection': 'posts', 'sort': FEED_SORT, 'filter': {'$or': [
+        {'category': 'food'}, {'categories': 'food'}
+    ]}},
+    {'name': 'can_chat: need posts by user', 'collection': 'posts', 'filter': {'user_id': 'x', 'type': 'need'}},
+    {'name': 'auto_post_jobs: post by job_id', 'collection': 'posts', 'filter': {'job_id': 'x'}},
+    {'name': 'feed near (sort by distance)', 'collection': 'posts',
+     'filter': {'geo': {'$nearSphere': {'$geometry': {'type': 'Point', 'coordinates': [2.35, 48.85]},
+                                        '$maxDistance': 10000}}}},
+    {'name': 'posts search', 'collection': 'posts', 'filter': {'$text': {'$search': 'logement'}}},
+    {'name': 'messages of a conversation', 'collection': 'messages', 'filter': {'conversation_id': 'a:b'},
+     'sort': [('created_at', ASCENDING), ('id', ASCENDING)]},
+    {'name': 'inbox', 'collection': 'conversations', 'filter': {'user_id': 'x'},
+     'sort': [('last_message_at', DESCENDING), ('partner_id', DESCENDING)]},
+    {'name': 'unread count', 'collection': 'conversations', 'filter': {'user_id': 'x', 'unread_count': {'$gt': 0}}},
+    {'name': 'comments of a post', 'collection': 'comments', 'filter': {'post_id': 'x'},
+     'sort': [('created_at', ASCENDING), ('id', ASCENDING)]},
+]
+
+
+async def ensure_indexes(db) -> None:
+    """
+    Cria os índices declarados; uma falha numa coleção não impede as demais,
+    exceto em REQUIRED_INDEX_COLLECTIONS, cuja falha interrompe a inicialização
+    """
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except Exception as e:
+            logging.error(f"Index creation failed for '{collection_name}': {e}")
+            if collection_name in REQUIRED_INDEX_COLLECTIONS:
+                raise
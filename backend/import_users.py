@@ -0,0 +1,81 @@
+"""
+Script para importar usuários em massa a partir de um arquivo CSV ou NDJSON
+Uso: python import_users.py usuarios.csv [--format csv|ndjson] [--batch-size 500]
+
+Colunas: email, password, name, role (migrant, volunteer, helper) e opcionalmente
+languages, help_categories, need_categories (no CSV separadas por ';'), phone, organization
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from bulk_import import detect_format, parse_rows, import_users
+from db_indexes import ensure_indexes
+from password_hashing import stored_rounds
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('DB_NAME', 'test_database')
+# Mesmo custo do servidor: BCRYPT_ROUNDS ou o valor calibrado para PASSWORD_HASH_BUDGET_MS (db.settings)
+BCRYPT_ROUNDS = os.getenv('BCRYPT_ROUNDS')
+PASSWORD_HASH_BUDGET_MS = float(os.getenv('PASSWORD_HASH_BUDGET_MS', '250'))
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+async def password_rounds(db) -> int:
+    if BCRYPT_ROUNDS:
+        return int(BCRYPT_ROUNDS)
+    # Sem calibração gravada usa o padrão; o login regrava o hash se o servidor calibrar um custo maior
+    return await stored_rounds(db, PASSWORD_HASH_BUDGET_MS) or DEFAULT_BCRYPT_ROUNDS
+
+
+async def main(path: str, fmt: str, batch_size: int):
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+    print("=" * 60)
+    print("📥 IMPORTAR USUÁRIOS - WATIZAT")
+    print("=" * 60)
+    print()
+
+    with open(path, encoding='utf-8-sig') as f:
+        text = f.read()
+
+    # Sem o índice único de email os duplicados não seriam detectados
+    await ensure_indexes(db)
+
+    rounds = await password_rounds(db)
+    print(f"🔐 Custo bcrypt: {rounds} rounds")
+
+    try:
+        async for event in import_users(db, parse_rows(text, fmt), rounds=rounds, batch_size=batch_size):
+            if event['event'] == 'error':
+                print(f"❌ Linha {event['row']} ({event.get('email') or 'sem email'}): {event['error']}")
+            elif event['event'] == 'progress':
+                print(f"⏳ {event['processed']} processados • {event['inserted']} importados • {event['failed']} com erro")
+            else:
+                print()
+                print(f"✅ Importação concluída: {event['inserted']} de {event['processed']} usuários importados")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa usuários em massa (CSV ou NDJSON)")
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=['csv', 'ndjson'])
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.path, args.format or detect_format(filename=args.path), args.batch_size))
+    except KeyboardInterrupt:
+        print("\n\n👋 Importação interrompida")
+        sys.exit(1)
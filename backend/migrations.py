@@ -0,0 +1,200 @@
+"""
+Migrações de dados executadas manualmente
+Uso: python migrations.py <nome>   (sem argumentos lista as migrações disponíveis)
+Todas são idempotentes e podem ser executadas com o servidor no ar.
+"""
+
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from authors import AUTHOR_FIELDS, AUTHORED_COLLECTIONS
+from auto_responses import AUTO_RESPONSES, AutoResponseCatalog
+from collection_versions import CollectionVersions
+from conversations import LEGACY_MESSAGES_FILTER, PREVIEW_FIELDS, PREVIEW_LENGTH
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('DB_NAME', 'test_database')
+
+# Migrações que reescrevem coleções servidas com ETag precisam invalidar as cópias dos clientes
+collection_versions = CollectionVersions()
+
+
+async def author_snapshots(db):
+    """Grava o snapshot do autor em documentos antigos (join e escrita feitos no MongoDB)"""
+    for collection_name in AUTHORED_COLLECTIONS:
+        before = await db[collection_name].count_documents({'author': {'$exists': False}})
+        await db[collection_name].aggregate([
+            {'$match': {'author': {'$exists': False}, 'user_id': {'$nin': [None, 'system']}}},
+            {'$lookup': {
+                'from': 'users',
+                'localField': 'user_id',
+                'foreignField': 'id',
+                'pipeline': [{'$project': {'_id': 0, **{field: 1 for field in AUTHOR_FIELDS}}}],
+                'as': 'author'
+            }},
+            {'$unwind': '$author'},
+            {'$project': {'_id': 1, 'author': 1}},
+            {'$merge': {'into': collection_name, 'on': '_id', 'whenMatched': 'merge', 'whenNotMatched': 'discard'}}
+        ]).to_list(None)
+        after = await db[collection_name].count_documents({'author': {'$exists': False}})
+        print(f"✅ {collection_name}: {before - after} snapshots gravados ({after} sem autor)")
+    await collection_versions.bump(db, 'posts', 'housing_listings')
+
+
+async def post_geo(db):
+    """Grava o ponto GeoJSON (geo) em posts antigos que só têm location {lat, lng}"""
+    result = await db.posts.update_many(
+        {
+            'geo': {'$exists': False},
+            'location.lat': {'$type': 'number', '$gte': -90, '$lte': 90},
+            'location.lng': {'$type': 'number', '$gte': -180, '$lte': 180}
+        },
+        [{'$set': {'geo': {'type': 'Point', 'coordinates': ['$location.lng', '$location.lat']}}}]
+    )
+    await collection_versions.bump(db, 'posts')
+    print(f"✅ posts: {result.modified_count} pontos geo gravados")
+
+
+async def auto_response_templates(db):
+    """Troca o texto copiado das respostas automáticas pela referência ao template"""
+    catalog = AutoResponseCatalog()
+    collapsed = 0
+    for category in AUTO_RESPONSES:
+        # Só cópias idênticas ao texto atual: textos antigos (já editados) continuam gravados
+        result = await db.messages.update_many(
+            {'is_auto_response': True, 'template_id': {'$exists': False}, 'message': catalog.text(category)},
+            {'$set': catalog.reference(category), '$unset': {'message': ''}}
+        )
+        collapsed += result.modified_count
+    remaining = await db.messages.count_documents({'is_auto_response': True, 'template_id': {'$exists': False}})
+    print(f"✅ messages: {collapsed} respostas automáticas convertidas ({remaining} com texto antigo mantido)")
+
+
+async def post_comment_previews(db):
+    """Grava comment_count e latest_comments nos posts a partir de db.comments"""
+    latest_size = int(os.getenv('LATEST_COMMENTS_SIZE', '3'))
+    await db.comments.aggregate([
+        {'$sort': {'post_id': 1, 'created_at': 1, 'id': 1}},
+        {'$group': {
+            '_id': '$post_id',
+            'comment_count': {'$sum': 1},
+            'latest_comments': {'$push': {
+                'id': '$id', 'user_id': '$user_id', 'comment': '$comment',
+                'created_at': '$created_at', 'author': '$author'
+            }}
+        }},
+        {'$project': {
+            '_id': 0,
+            'id': '$_id',
+            'comment_count': 1,
+            'latest_comments': {'$slice': ['$latest_comments', -latest_size]}
+        }},
+        {'$merge': {'into': 'posts', 'on': 'id', 'whenMatched': 'merge', 'whenNotMatched': 'discard'}}
+    ], allowDiskUse=True).to_list(None)
+    result = await db.posts.update_many(
+        {'comment_count': {'$exists': False}},
+        {'$set': {'comment_count': 0, 'latest_comments': []}}
+    )
+    await collection_versions.bump(db, 'posts')
+    print(f"✅ posts: contagens de comentários gravadas ({result.modified_count} posts sem comentários)")
+
+
+async def conversations(db):
+    """Monta db.conversations a partir do histórico de db.messages (sem mensagens não lidas)"""
+    preview = {field: f'${field}' for field in PREVIEW_FIELDS}
+    preview['message'] = {'$substrCP': [{'$ifNull': ['$message', '']}, 0, PREVIEW_LENGTH]}
+    await db.messages.aggregate([
+        {'$sort': {'created_at': 1}},
+        # Cada mensagem aparece na caixa de entrada das duas pontas (exceto 'system')
+        {'$project': {'side': [
+            {'user_id': '$from_user_id', 'partner_id': '$to_user_id'},
+            {'user_id': '$to_user_id', 'partner_id': '$from_user_id'}
+        ], 'preview': preview, 'created_at': 1}},
+        {'$unwind': '$side'},
+        {'$match': {'side.user_id': {'$ne': 'system'}}},
+        {'$group': {
+            '_id': {'user_id': '$side.user_id', 'partner_id': '$side.partner_id'},
+            'last_message': {'$last': '$preview'},
+            'last_message_at': {'$last': '$created_at'}
+        }},
+        {'$project': {
+            '_id': 0,
+            'user_id': '$_id.user_id',
+            'partner_id': '$_id.partner_id',
+            'last_message': 1,
+            'last_message_at': 1
+        }},
+        # Conversas já criadas pelo servidor são mais recentes que o histórico: ficam como estão
+        {'$merge': {
+            'into': 'conversations',
+            'on': ['user_id', 'partner_id'],
+            'whenMatched': 'keepExisting',
+            'whenNotMatched': 'insert'
+        }}
+    ], allowDiskUse=True).to_list(None)
+    await db.conversations.update_many({'unread_count': {'$exists': False}}, {'$set': {'unread_count': 0}})
+    total = await db.conversations.count_documents({})
+    print(f"✅ conversations: {total} conversas")
+
+
+async def message_conversation_ids(db):
+    """Grava conversation_id (par de ids ordenado) nas mensagens antigas, em lotes"""
+    batch_size = int(os.getenv('MIGRATION_BATCH_SIZE', '1000'))
+    updated = 0
+    while True:
+        # {'conversation_id': None} usa o índice messages_conversation_id_created_at_id
+        batch = await db.messages.find(LEGACY_MESSAGES_FILTER, {'_id': 1}).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        result = await db.messages.update_many(
+            {'_id': {'$in': [doc['_id'] for doc in batch]}, **LEGACY_MESSAGES_FILTER},
+            [{'$set': {'conversation_id': {'$concat': [
+                {'$min': ['$from_user_id', '$to_user_id']}, ':', {'$max': ['$from_user_id', '$to_user_id']}
+            ]}}}]
+        )
+        updated += result.modified_count
+        print(f"   {updated} mensagens atualizadas...")
+        if not result.modified_count:
+            # Nada mudou no lote: repetir a consulta traria os mesmos documentos para sempre
+            print("⚠️  Lote sem alterações, interrompendo")
+            break
+    remaining = await db.messages.count_documents({'conversation_id': None})
+    print(f"✅ messages: {updated} conversation_id gravados, {remaining} mensagens sem remetente/destinatário ignoradas "
+          f"(reinicie o servidor para desligar a consulta legada)")
+
+
+MIGRATIONS = {
+    'author_snapshots': author_snapshots,
+    'post_geo': post_geo,
+    'auto_response_templates': auto_response_templates,
+    'post_comment_previews': post_comment_previews,
+    'conversations': conversations,
+    'message_conversation_ids': message_conversation_ids,
+}
+
+
+async def main(name: str) -> int:
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    try:
+        print(f"🔄 Executando migração '{name}'...")
+        await MIGRATIONS[name](db)
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in MIGRATIONS:
+        print("Migrações disponíveis:")
+        for migration_name, migration in MIGRATIONS.items():
+            print(f"  • {migration_name}: {migration.__doc__}")
+        sys.exit(1)
+    sys.exit(asyncio.run(main(sys.argv[1])))
@@ -0,0 +1,49 @@
+"""
+Paginação por cursor (keyset) para consultas ordenadas no MongoDB
+O cursor é opaco para o cliente: base64 dos valores de ordenação do último item da página
+"""
+
+import base64
+import json
+from typing import List, Optional
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decodifica o cursor; ValueError se for inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(fields: List[str], values: list, descending: bool = True) -> dict:
+    """
+    Filtro para os itens depois do cursor na ordenação (fields, todos na mesma direção).
+    Ex.: (created_at, id) desc -> created_at < c OR (created_at == c AND id < i)
+    """
+    op = '$lt' if descending else '$gt'
+    branches = []
+    for i, field in enumerate(fields):
+        branch = {fields[j]: values[j] for j in range(i)}
+        branch[field] = {op: values[i]}
+        branches.append(branch)
+    return branches[0] if len(branches) == 1 else {'$or': branches}
+
+
+def and_filters(*filters: Optional[dict]) -> dict:
+    """Combina filtros com $and, ignorando os vazios"""
+    filters = [f for f in filters if f]
+    if not filters:
+        return {}
+    if len(filters) == 1:
+        return filters[0]
+    return {'$and': filters}
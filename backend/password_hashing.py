@@ -0,0 +1,137 @@
+"""
+Hash e verificação de senhas (bcrypt) fora do event loop
+Usa um pool de threads limitado com fila máxima; quando saturado, recusa novas tarefas.
+O custo (rounds) pode ser calibrado na inicialização para um orçamento de latência.
+"""
+
+import asyncio
+import time
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from pymongo.errors import DuplicateKeyError
+
+from timing import TimingStats
+
+
+def calibration_key(budget_ms: float) -> dict:
+    """Documento de db.settings com o custo calibrado para o orçamento"""
+    return {'_id': f'bcrypt_rounds:{budget_ms:g}'}
+
+
+async def stored_rounds(db, budget_ms: float) -> Optional[int]:
+    """Custo gravado pela calibração do servidor (None se nenhum worker calibrou ainda)"""
+    doc = await db.settings.find_one(calibration_key(budget_ms))
+    return doc['rounds'] if doc else None
+
+
+class PasswordHasherSaturated(Exception):
+    """Pool de hashing cheio: a requisição deve ser recusada (503)"""
+
+
+class PasswordHasher:
+    def __init__(self, max_workers: int = 2, max_queue: int = 64, rounds: int = 12):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._in_flight = 0
+        self.rejected = 0
+        self.queue_wait = TimingStats()
+        self.hash_time = TimingStats()
+
+    async def _run(self, func, *args):
+        # Tarefas em execução + aguardando na fila
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherSaturated()
+
+        self._in_flight += 1
+        submitted_at = time.perf_counter()
+
+        def timed():
+            started_at = time.perf_counter()
+            result = func(*args)
+            finished_at = time.perf_counter()
+            return result, (started_at - submitted_at) * 1000, (finished_at - started_at) * 1000
+
+        try:
+            loop = asyncio.get_running_loop()
+            result, wait_ms, run_ms = await loop.run_in_executor(self._executor, timed)
+        finally:
+            self._in_flight -= 1
+
+        self.queue_wait.add(wait_ms)
+        self.hash_time.add(run_ms)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Gera o hash bcrypt da senha"""
+        hashed = await self._run(bcrypt.hashpw, password.encode(), bcrypt.gensalt(rounds=self.rounds))
+        return hashed.decode()
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Verifica a senha contra o hash armazenado"""
+        return await self._run(bcrypt.checkpw, password.encode(), hashed.encode())
+
+    @staticmethod
+    def hash_cost(hashed: str) -> int:
+        """Custo gravado no próprio hash: $2b$<rounds>$<salt+hash>"""
+        return int(hashed.split('$')[2])
+
+    def needs_rehash(self, hashed: str) -> bool:
+        # Só sobe o custo: hashes mais fortes que o atual continuam como estão
+        return self.hash_cost(hashed) < self.rounds
+
+    async def calibrate(self, budget_ms: float, min_rounds: int = 10, max_rounds: int = 16) -> int:
+        """Escolhe o maior custo cujo hash cabe no orçamento de latência neste hardware"""
+        def measure():
+            salt = bcrypt.gensalt(rounds=min_rounds)
+            timings = []
+            for _ in range(3):
+                started_at = time.perf_counter()
+                bcrypt.hashpw(b'calibration-password', salt)
+                timings.append((time.perf_counter() - started_at) * 1000)
+            return min(timings)
+
+        loop = asyncio.get_running_loop()
+        base_ms = await loop.run_in_executor(self._executor, measure)
+
+        # Cada round a mais dobra o tempo de hash
+        rounds = min_rounds
+        while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= budget_ms:
+            rounds += 1
+        self.rounds = rounds
+        return rounds
+
+    async def load_or_calibrate(self, db, budget_ms: float) -> int:
+        """
+        Custo compartilhado por todos os workers: o primeiro a calibrar grava em db.settings
+        e os demais usam o valor gravado (apague o documento para recalibrar).
+        """
+        rounds = await stored_rounds(db, budget_ms)
+        if rounds is None:
+            try:
+                await db.settings.update_one(
+                    calibration_key(budget_ms), {'$setOnInsert': {'rounds': await self.calibrate(budget_ms)}}, upsert=True
+                )
+            except DuplicateKeyError:
+                pass  # outro worker gravou ao mesmo tempo
+            rounds = await stored_rounds(db, budget_ms)
+        self.rounds = rounds
+        return self.rounds
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            'rounds': self.rounds,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self._in_flight,
+            'rejected': self.rejected,
+            'queue_wait': self.queue_wait.as_dict(),
+            'hash_time': self.hash_time.as_dict()
+        }
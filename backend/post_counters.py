@@ -0,0 +1,113 @@
+"""
+Contadores de posts materializados (total, por tipo e por categoria) em db.post_counters
+Mantidos com $inc a cada criação/exclusão de post; a reconciliação periódica recalcula tudo
+a partir de db.posts e corrige desvios (ex: escritas que falharam entre o post e o contador;
+um $inc concorrente com a própria reconciliação fica corrigido na rodada seguinte).
+Documentos: {'_id': 'total' | 'type:<tipo>' | 'category:<cat>' | 'primary_category:<cat>', 'count': n}
+  - category: posts com a categoria em category ou categories (mesma regra do filtro do feed)
+  - primary_category: só o campo category (usado em /admin/stats)
+"""
+
+import asyncio
+import logging
+from collections import Counter
+
+from pymongo import UpdateOne
+
+
+def counter_keys(post: dict) -> list:
+    keys = ['total']
+    if post.get('type'):
+        keys.append(f"type:{post['type']}")
+    if post.get('category'):
+        keys.append(f"primary_category:{post['category']}")
+    categories = {post.get('category')} | set(post.get('categories') or [])
+    keys.extend(f"category:{cat}" for cat in categories if cat)
+    return keys
+
+
+async def increment_post_counts(db, posts: list, sign: int = 1) -> None:
+    """sign=1 para posts criados, -1 para excluídos; um único bulk_write"""
+    deltas = Counter()
+    for post in posts:
+        deltas.update(counter_keys(post))
+    if not deltas:
+        return
+    await db.post_counters.bulk_write([
+        UpdateOne({'_id': key}, {'$inc': {'count': sign * n}}, upsert=True)
+        for key, n in deltas.items()
+    ], ordered=False)
+
+
+async def get_post_counts(db) -> dict:
+    counts = {'total': 0, 'by_type': {}, 'by_category': {}, 'by_primary_category': {}}
+    groups = {'type': 'by_type', 'category': 'by_category', 'primary_category': 'by_primary_category'}
+    async for doc in db.post_counters.find({}):
+        if doc['_id'] == 'total':
+            counts['total'] = doc['count']
+            continue
+        group, _, value = doc['_id'].partition(':')
+        if group in groups and doc['count'] > 0:
+            counts[groups[group]][value] = doc['count']
+    return counts
+
+
+async def reconcile_post_counts(db) -> int:
+    """Recalcula todos os contadores a partir de db.posts; retorna quantos estavam errados"""
+    result = await db.posts.aggregate([{'$facet': {
+        'total': [{'$count': 'count'}],
+        'type': [{'$group': {'_id': '$type', 'count': {'$sum': 1}}}],
+        'primary_category': [{'$group': {'_id': '$category', 'count': {'$sum': 1}}}],
+        'category': [
+            {'$project': {'categories': {'$setUnion': [['$category'], {'$ifNull': ['$categories', []]}]}}},
+            {'$unwind': '$categories'},
+            {'$group': {'_id': '$categories', 'count': {'$sum': 1}}}
+        ]
+    }}]).to_list(1)
+    facets = result[0]
+
+    expected = {'total': facets['total'][0]['count'] if facets['total'] else 0}
+    for group in ['type', 'primary_category', 'category']:
+        for row in facets[group]:
+            if row['_id']:
+                expected[f"{group}:{row['_id']}"] = row['count']
+
+    current = {doc['_id']: doc['count'] async for doc in db.post_counters.find({})}
+    # Chaves que sumiram de db.posts voltam a zero
+    for key in current:
+        expected.setdefault(key, 0)
+
+    fixes = [
+        UpdateOne({'_id': key}, {'$set': {'count': count}}, upsert=True)
+        for key, count in expected.items() if current.get(key) != count
+    ]
+    if fixes:
+        await db.post_counters.bulk_write(fixes, ordered=False)
+    return len(fixes)
+
+
+class PostCounterReconciler:
+    """Reconciliação periódica; na primeira execução também popula contadores vazios"""
+
+    def __init__(self, interval_seconds: float = 3600.0):
+        self.interval_seconds = interval_seconds
+        self._task = None
+
+    async def _loop(self, db) -> None:
+        while True:
+            try:
+                fixed = await reconcile_post_counts(db)
+                if fixed:
+                    logging.warning(f"Post counters reconciled: {fixed} counters repaired")
+            except Exception as e:
+                logging.error(f"Post counters reconciliation error: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(db))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
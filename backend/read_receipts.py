@@ -0,0 +1,82 @@
+"""
+Confirmações de leitura agrupadas em memória
+Cada marcação guarda só o maior instante lido por (user_id, partner_id); um flush periódico
+grava tudo em db.conversations com um único bulk_write (rolar uma conversa não gera uma escrita por mensagem).
+"""
+
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+
+class ReadReceiptBuffer:
+    def __init__(self, flush_seconds: float = 1.0):
+        self.flush_seconds = flush_seconds
+        # (user_id, partner_id) -> created_at (ISO) da mensagem mais recente lida
+        self._pending = {}
+        self._task = None
+        self.marked = 0
+        self.flushed = 0
+
+    def mark(self, user_id: str, partner_id: str, read_until: str) -> None:
+        key = (user_id, partner_id)
+        self._pending[key] = max(read_until, self._pending.get(key, ''))
+        self.marked += 1
+
+    def pending_partners(self, user_id: str) -> list:
+        return [partner_id for (reader_id, partner_id) in self._pending if reader_id == user_id]
+
+    async def flush(self, db, on_flushed=None) -> int:
+        """Grava as leituras pendentes; on_flushed(user_id, partner_id, read_until) é chamado para cada uma"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+
+        # Só zera o contador se nada foi recebido depois do que foi lido (senão a mensagem nova segue não lida);
+        # compara com last_received_at e não last_message_at, que também avança com as respostas do leitor
+        operations = [
+            UpdateOne(
+                {'user_id': user_id, 'partner_id': partner_id},
+                [{'$set': {
+                    'last_read_at': {'$max': [{'$ifNull': ['$last_read_at', '']}, read_until]},
+                    'unread_count': {'$cond': [
+                        {'$gte': [read_until, {'$ifNull': ['$last_received_at', '']}]}, 0, '$unread_count'
+                    ]}
+                }}]
+            )
+            for (user_id, partner_id), read_until in pending.items()
+        ]
+        try:
+            await db.conversations.bulk_write(operations, ordered=False)
+        except Exception:
+            # Devolve ao buffer para a próxima tentativa (sem perder marcações mais novas)
+            for key, read_until in pending.items():
+                self._pending[key] = max(read_until, self._pending.get(key, ''))
+            raise
+        self.flushed += len(operations)
+
+        if on_flushed:
+            for (user_id, partner_id), read_until in pending.items():
+                await on_flushed(user_id, partner_id, read_until)
+        return len(operations)
+
+    async def _flush_loop(self, db, on_flushed) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush(db, on_flushed)
+            except Exception as e:
+                logging.error(f"Read receipts flush error: {e}")
+
+    def start(self, db, on_flushed=None) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop(db, on_flushed))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {'pending': len(self._pending), 'marked': self.marked, 'flushed': self.flushed}
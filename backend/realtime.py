@@ -0,0 +1,135 @@
+"""
+Eventos em tempo real (post_created, message_received, comment_added)
+Cada worker mantém o registro das próprias conexões; o broker distribui os eventos entre workers:
+  - ChangeStreamBroker: grava em realtime_events e todos os workers leem via change stream (produção)
+  - LocalBroker: entrega direta no próprio processo (um único worker / testes)
+Evento: {'type': ..., 'audience': [user_id, ...] ou None (todos), 'data': {...}}
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+class Connection:
+    def __init__(self, user_id: str, claims, max_queue: int):
+        self.user_id = user_id
+        self.claims = claims
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+
+class ConnectionRegistry:
+    """
+    Conexões abertas por usuário neste worker.
+    accepts(claims, event) decide a visibilidade de eventos sem audience (ex: posts "need").
+    """
+
+    def __init__(self, accepts: Optional[Callable] = None, max_queue: int = 100):
+        self.accepts = accepts
+        self.max_queue = max_queue
+        self._connections = {}
+        self._delivered = 0
+        self._dropped = 0
+
+    def connect(self, user_id: str, claims=None) -> Connection:
+        connection = Connection(user_id, claims, self.max_queue)
+        self._connections.setdefault(user_id, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: Connection) -> None:
+        connections = self._connections.get(connection.user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._connections[connection.user_id]
+
+    def dispatch(self, event: dict) -> None:
+        """Entrega o evento às conexões locais do público (chamado pelo broker)"""
+        audience = event.get('audience')
+        if audience is None:
+            targets = [c for connections in self._connections.values() for c in connections]
+        else:
+            targets = [c for user_id in audience for c in self._connections.get(user_id, ())]
+
+        for connection in targets:
+            if self.accepts and not self.accepts(connection.claims, event):
+                continue
+            try:
+                connection.queue.put_nowait(event)
+                self._delivered += 1
+            except asyncio.QueueFull:
+                # Cliente lento: descarta a fila e pede que recarregue tudo
+                self._dropped += connection.queue.qsize()
+                while not connection.queue.empty():
+                    connection.queue.get_nowait()
+                connection.queue.put_nowait({'type': 'resync', 'data': {}})
+
+    def stats(self) -> dict:
+        return {
+            'users': len(self._connections),
+            'connections': sum(len(connections) for connections in self._connections.values()),
+            'delivered': self._delivered,
+            'dropped': self._dropped
+        }
+
+
+class LocalBroker:
+    """Entrega no próprio processo: só enxerga eventos publicados neste worker"""
+
+    def __init__(self):
+        self._handler = None
+
+    async def publish(self, event: dict) -> None:
+        if self._handler:
+            self._handler(event)
+
+    def start(self, handler: Callable) -> None:
+        self._handler = handler
+
+    def stop(self) -> None:
+        self._handler = None
+
+
+class ChangeStreamBroker:
+    """
+    Publica em db.realtime_events; cada worker acompanha as inserções via change stream
+    (requer replica set, como no Atlas). Os documentos expiram pelo índice TTL em created_at.
+    """
+
+    def __init__(self, db, collection_name: str = 'realtime_events', retry_seconds: float = 5.0):
+        self.collection = db[collection_name]
+        self.retry_seconds = retry_seconds
+        self._task = None
+
+    async def publish(self, event: dict) -> None:
+        # created_at como datetime (não ISO string): exigido pelo índice TTL
+        await self.collection.insert_one({**event, 'created_at': datetime.now(timezone.utc)})
+
+    async def _watch(self, handler: Callable) -> None:
+        resume_token = None
+        while True:
+            try:
+                pipeline = [{'$match': {'operationType': 'insert'}}]
+                async with self.collection.watch(pipeline, resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        document = change['fullDocument']
+                        handler({key: document.get(key) for key in ('type', 'audience', 'data')})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Erros transitórios já são retomados pelo driver; aqui o stream não pode ser retomado
+                logging.error(f"Realtime change stream error: {e}")
+                resume_token = None
+                await asyncio.sleep(self.retry_seconds)
+
+    def start(self, handler: Callable) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch(handler))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, BackgroundTasks, Request, Response, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -6,21 +7,38 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
-import bcrypt
 import jwt
 from openai import AsyncOpenAI
 from pdf_processor import WatizatPDFProcessor
-from auto_responses import get_auto_response, format_auto_response_post
+from auto_responses import AutoResponseCatalog
 from help_locations import HELP_LOCATIONS, get_all_help_locations, get_help_locations_by_category
+from user_cache import UserCache
+from password_hashing import PasswordHasher, PasswordHasherSaturated
+from token_revocation import RevokedTokenVersions, REVOKE_ALL
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from db_indexes import ensure_indexes
+from bulk_import import detect_format, parse_rows, import_users
+from pagination import encode_cursor, decode_cursor, keyset_filter, and_filters
+from authors import AUTHOR_FIELDS, author_snapshot, attach_authors, fan_out_author_changes
+from collection_versions import CollectionVersions
+from realtime import ConnectionRegistry, LocalBroker, ChangeStreamBroker
+from timing import TimingStats
+from conversations import LEGACY_MESSAGES_FILTER, PREVIEW_LENGTH, conversation_id, record_messages
+from read_receipts import ReadReceiptBuffer
+from post_counters import PostCounterReconciler, increment_post_counts, get_post_counts
 import math
 from urllib.parse import urlparse
 import aiohttp
 import re
 import random
+import json
+import asyncio
+import time
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -71,9 +89,70 @@ async def root():
 security = HTTPBearer()
 JWT_SECRET = os.environ.get('JWT_SECRET', 'default_secret')
 ALGORITHM = "HS256"
+ACCESS_TOKEN_MINUTES = int(os.environ.get('ACCESS_TOKEN_MINUTES', '15'))
+REFRESH_TOKEN_DAYS = int(os.environ.get('REFRESH_TOKEN_DAYS', '30'))
+POSTS_PAGE_SIZE = int(os.environ.get('POSTS_PAGE_SIZE', '100'))
+COMMENTS_PAGE_SIZE = int(os.environ.get('COMMENTS_PAGE_SIZE', '50'))
+CONVERSATIONS_PAGE_SIZE = int(os.environ.get('CONVERSATIONS_PAGE_SIZE', '50'))
+MESSAGES_PAGE_SIZE = int(os.environ.get('MESSAGES_PAGE_SIZE', '50'))
+# Confirmações de leitura: agrupadas em memória e gravadas em lote
+read_receipts = ReadReceiptBuffer(
+    flush_seconds=float(os.environ.get('READ_RECEIPTS_FLUSH_SECONDS', '1'))
+)
+
+# Há mensagens sem conversation_id? Verificado na inicialização; após o backfill fica False
+legacy_messages_pending = True
+
+# Comentários mais recentes guardados no próprio post (prévia no feed)
+LATEST_COMMENTS_SIZE = int(os.environ.get('LATEST_COMMENTS_SIZE', '3'))
+# Busca: peso do bônus de recência somado ao textScore e idade (dias) em que o bônus cai pela metade
+SEARCH_RECENCY_WEIGHT = float(os.environ.get('SEARCH_RECENCY_WEIGHT', '1.0'))
+SEARCH_RECENCY_HALF_LIFE_DAYS = float(os.environ.get('SEARCH_RECENCY_HALF_LIFE_DAYS', '30'))
+# Raio equatorial usado pelo MongoDB para converter km em radianos ($centerSphere)
+EARTH_RADIUS_KM = 6378.1
 
 pdf_processor = WatizatPDFProcessor()
 
+# Cache de usuários autenticados (por worker). O TTL limita a defasagem entre workers.
+user_cache = UserCache(
+    max_size=int(os.environ.get('USER_CACHE_MAX_SIZE', '5000')),
+    ttl_seconds=float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+)
+
+# Pool limitado para bcrypt: não bloqueia o event loop e recusa (503) quando saturado
+password_hasher = PasswordHasher(
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '2')),
+    max_queue=int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '64')),
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12'))
+)
+# Orçamento de latência por hash usado na calibração do custo (ignorado se BCRYPT_ROUNDS definido)
+PASSWORD_HASH_BUDGET_MS = float(os.environ.get('PASSWORD_HASH_BUDGET_MS', '250'))
+
+# Versões de token revogadas (logout, troca de role, exclusão), recarregadas do MongoDB
+revoked_tokens = RevokedTokenVersions(
+    refresh_seconds=float(os.environ.get('TOKEN_REVOCATION_REFRESH_SECONDS', '30'))
+)
+
+# Contadores de posts por tipo/categoria: reconciliação periódica com db.posts
+post_counter_reconciler = PostCounterReconciler(
+    interval_seconds=float(os.environ.get('POST_COUNTERS_RECONCILE_SECONDS', '3600'))
+)
+
+# Textos das respostas automáticas: mensagens guardam só a referência ao template
+auto_response_catalog = AutoResponseCatalog()
+
+# Latência do POST /posts e da entrega das respostas automáticas (em background), medidas à parte
+create_post_timing = TimingStats()
+auto_response_timing = TimingStats()
+
+# Eventos em tempo real (/api/stream)
+REALTIME_HEARTBEAT_SECONDS = float(os.environ.get('REALTIME_HEARTBEAT_SECONDS', '25'))
+
+# Versões das coleções listadas (ETag); escritas de outros workers aparecem após o refresh
+collection_versions = CollectionVersions(
+    refresh_seconds=float(os.environ.get('COLLECTION_VERSIONS_REFRESH_SECONDS', '2'))
+)
+
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -115,6 +194,17 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class TokenClaims(BaseModel):
+    """Dados do usuário carregados no access token (sem consulta ao banco)"""
+    id: str
+    email: str
+    role: str
+    help_categories: List[str] = Field(default_factory=list)
+    need_categories: List[str] = Field(default_factory=list)
+
 class Post(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -233,36 +323,157 @@ class HousingListingCreate(BaseModel):
     exchange_services: Optional[str] = None
     photos: List[str] = []
 
-def create_token(user_id: str, email: str) -> str:
+# Campos do usuário copiados para o access token: alterá-los exige invalidar os access tokens emitidos
+CLAIM_FIELDS = ['email', 'role', 'help_categories', 'need_categories']
+
+def create_access_token(user: dict) -> str:
+    """Access token de curta duração com role, categorias e token_version"""
     payload = {
-        'user_id': user_id,
-        'email': email,
-        'exp': datetime.now(timezone.utc) + timedelta(days=30)
+        'type': 'access',
+        'user_id': user['id'],
+        'email': user['email'],
+        'role': user['role'],
+        'help_categories': user.get('help_categories') or [],
+        'need_categories': user.get('need_categories') or [],
+        'tv': user.get('token_version', 0),
+        'cv': user.get('claims_version', 0),
+        'exp': datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_MINUTES)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def create_refresh_token(user: dict) -> str:
+    payload = {
+        'type': 'refresh',
+        'user_id': user['id'],
+        'tv': user.get('token_version', 0),
+        'exp': datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_DAYS)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM)
+
+def create_session_tokens(user: dict) -> dict:
+    return {
+        'token': create_access_token(user),
+        'refresh_token': create_refresh_token(user),
+        'expires_in': ACCESS_TOKEN_MINUTES * 60
+    }
+
+def decode_token(token: str, token_type: str = 'access') -> dict:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        user_id = payload.get('user_id')
-        
-        user = await db.users.find_one({'id': user_id}, {'_id': 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return User(**user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except Exception:
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    # Tokens antigos (30 dias, sem 'type') continuam aceitos como access token
+    if payload.get('type', 'access') != token_type or not payload.get('user_id'):
         raise HTTPException(status_code=401, detail="Invalid token")
+    claims_version = payload.get('cv', 0) if token_type == 'access' else None
+    if revoked_tokens.is_revoked(payload['user_id'], payload.get('tv', 0), claims_version):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
+
+async def revoke_user_claims(user_id: str) -> None:
+    """Invalida só os access tokens (claims desatualizadas); incrementa claims_version"""
+    user = await db.users.find_one_and_update(
+        {'id': user_id},
+        {'$inc': {'claims_version': 1}},
+        projection={'_id': 0, 'claims_version': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if user:
+        await revoked_tokens.revoke_claims(db, user_id, user['claims_version'])
+
+async def revoke_user_tokens(user_id: str) -> None:
+    """Invalida todos os tokens emitidos para o usuário (incrementa token_version)"""
+    user = await db.users.find_one_and_update(
+        {'id': user_id},
+        {'$inc': {'token_version': 1}},
+        projection={'_id': 0, 'token_version': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    min_version = user['token_version'] if user else REVOKE_ALL
+    await revoked_tokens.revoke(db, user_id, min_version)
+
+def conditional_etag(request: Request, response: Response, collections: List[str], *parts) -> Optional[Response]:
+    """
+    Calcula o ETag (versões das coleções + query string + partes extras) antes de qualquer consulta.
+    Retorna uma resposta 304 se o cliente já tem essa versão; senão anota o ETag na resposta.
+    """
+    etag = collection_versions.etag(collections, sorted(request.query_params.multi_items()), *parts)
+    if CollectionVersions.matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={'ETag': etag})
+    response.headers['ETag'] = etag
+    return None
+
+async def refresh_author_snapshots(user_id: str, changes: dict) -> None:
+    await fan_out_author_changes(db, user_id, changes)
+    await collection_versions.bump(db, 'posts', 'housing_listings')
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={'Retry-After': '1'})
+
+async def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return await password_hasher.verify(password, hashed)
+    except PasswordHasherSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={'Retry-After': '1'})
+
+async def rehash_password(user_id: str, password: str, old_hash: str) -> None:
+    """Regrava o hash com o custo atual (executado após a resposta do login)"""
+    try:
+        new_hash = await password_hasher.hash(password)
+    except PasswordHasherSaturated:
+        return  # tenta de novo no próximo login
+    await db.users.update_one({'id': user_id, 'password': old_hash}, {'$set': {'password': new_hash}})
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = decode_token(credentials.credentials)
+    user_id = payload['user_id']
+    
+    # A invalidação só alcança o worker que fez a escrita: nos demais, um token com outro
+    # claims_version (ex: emitido após troca de role) não usa a entrada antiga do cache
+    cached_user = user_cache.get(user_id, payload.get('cv', 0))
+    if cached_user is not None:
+        return cached_user
+    
+    user = await db.users.find_one({'id': user_id}, {'_id': 0, 'password': 0})
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    
+    current_user = User(**user)
+    user_cache.set(user_id, current_user, user.get('claims_version', 0))
+    return current_user
+
+async def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenClaims:
+    """Autoriza pelo conteúdo do token, sem ler db.users (exceto tokens antigos)"""
+    return await claims_from_payload(decode_token(credentials.credentials))
+
+async def claims_from_payload(payload: dict) -> TokenClaims:
+    if 'role' in payload:
+        return TokenClaims(
+            id=payload['user_id'],
+            email=payload['email'],
+            role=payload['role'],
+            help_categories=payload.get('help_categories', []),
+            need_categories=payload.get('need_categories', [])
+        )
+    
+    user = await db.users.find_one(
+        {'id': payload['user_id']},
+        {'_id': 0, 'id': 1, 'email': 1, 'role': 1, 'help_categories': 1, 'need_categories': 1}
+    )
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return TokenClaims(**user)
 
 @api_router.post("/auth/register")
 async def register(user_data: UserRegister):
-    existing = await db.users.find_one({'email': user_data.email}, {'_id': 0})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    hashed_pw = bcrypt.hashpw(user_data.password.encode(), bcrypt.gensalt())
+    # Email duplicado é detectado pelo índice único (users_email_unique) no insert
+    hashed_pw = await hash_password(user_data.password)
     
     user = User(
         email=user_data.email,
@@ -272,7 +483,8 @@ async def register(user_data: UserRegister):
     )
     
     user_dict = user.model_dump()
-    user_dict['password'] = hashed_pw.decode()
+    user_dict['password'] = hashed_pw
+    user_dict['token_version'] = 0
     user_dict['created_at'] = user_dict['created_at'].isoformat()
     
     if user_data.role == 'volunteer':
@@ -302,40 +514,72 @@ async def register(user_data: UserRegister):
         user_dict['location'] = user_data.location
         user_dict['show_location'] = user_data.show_location
     
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     
-    token = create_token(user.id, user.email)
-    return {'token': token, 'user': user}
+    return {**create_session_tokens(user_dict), 'user': user}
 
 @api_router.post("/auth/login")
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, background_tasks: BackgroundTasks):
     user_data = await db.users.find_one({'email': credentials.email}, {'_id': 0})
     
     if not user_data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(credentials.password.encode(), user_data['password'].encode()):
+    if not await verify_password(credentials.password, user_data['password']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    user_data.pop('password')
+    password_hash = user_data.pop('password')
+    if password_hasher.needs_rehash(password_hash):
+        background_tasks.add_task(rehash_password, user_data['id'], credentials.password, password_hash)
+    tokens = create_session_tokens(user_data)
     if isinstance(user_data['created_at'], str):
         user_data['created_at'] = datetime.fromisoformat(user_data['created_at'])
     
     user = User(**user_data)
-    token = create_token(user.id, user.email)
     
-    return {'token': token, 'user': user}
+    return {**tokens, 'user': user}
+
+@api_router.post("/auth/refresh")
+async def refresh_session(data: RefreshTokenRequest):
+    """Emite um novo access token com claims atualizadas a partir do refresh token"""
+    payload = decode_token(data.refresh_token, token_type='refresh')
+    
+    user = await db.users.find_one({'id': payload['user_id']}, {'_id': 0, 'password': 0})
+    if not user or payload.get('tv', 0) != user.get('token_version', 0):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    
+    return {'token': create_access_token(user), 'expires_in': ACCESS_TOKEN_MINUTES * 60}
+
+@api_router.post("/auth/logout")
+async def logout(current_user: User = Depends(get_current_user)):
+    """Encerra todas as sessões do usuário"""
+    await revoke_user_tokens(current_user.id)
+    user_cache.invalidate(current_user.id)
+    return {'message': 'Logged out'}
 
 @api_router.get("/profile")
 async def get_profile(current_user: User = Depends(get_current_user)):
     return current_user
 
 @api_router.put("/profile")
-async def update_profile(updates: dict, current_user: User = Depends(get_current_user)):
+async def update_profile(updates: dict, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
     allowed_fields = ['name', 'bio', 'location', 'languages', 'categories', 'help_categories', 'need_categories', 'display_name', 'use_display_name']
     update_data = {k: v for k, v in updates.items() if k in allowed_fields}
     
     await db.users.update_one({'id': current_user.id}, {'$set': update_data})
+    user_cache.invalidate(current_user.id)
+    
+    # Categorias vão no access token (feed, chat, /api/stream): tokens de outras sessões ficam desatualizados
+    if any(field in CLAIM_FIELDS for field in update_data):
+        await revoke_user_claims(current_user.id)
+    
+    # Nome exibido mudou: atualizar o snapshot do autor em posts/comentários/anúncios
+    author_changes = {k: v for k, v in update_data.items() if k in AUTHOR_FIELDS}
+    if author_changes:
+        background_tasks.add_task(refresh_author_snapshots, current_user.id, author_changes)
     
     updated_user = await db.users.find_one({'id': current_user.id}, {'_id': 0, 'password': 0})
     if isinstance(updated_user['created_at'], str):
@@ -343,8 +587,21 @@ async def update_profile(updates: dict, current_user: User = Depends(get_current
     
     return User(**updated_user)
 
+def location_to_geo(location: Optional[dict]) -> Optional[dict]:
+    """Converte {lat, lng} em ponto GeoJSON (indexado em 2dsphere)"""
+    if not location:
+        return None
+    lat, lng = location.get('lat'), location.get('lng')
+    if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return {'type': 'Point', 'coordinates': [lng, lat]}
+
 @api_router.post("/posts", response_model=Post)
-async def create_post(post_data: PostCreate, current_user: User = Depends(get_current_user)):
+async def create_post(post_data: PostCreate, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
+    started_at = time.perf_counter()
+    
     # Se não há categorias múltiplas, usar a categoria principal
     categories_list = post_data.categories if post_data.categories else [post_data.category]
     
@@ -361,28 +618,63 @@ async def create_post(post_data: PostCreate, current_user: User = Depends(get_cu
     post_dict = post.model_dump()
     post_dict['created_at'] = post_dict['created_at'].isoformat()
     post_dict['images'] = post_data.images or []
+    post_dict['author'] = author_snapshot(current_user)
+    post_dict['comment_count'] = 0
+    post_dict['latest_comments'] = []
+    geo = location_to_geo(post_data.location)
+    if geo:
+        post_dict['geo'] = geo
     
     await db.posts.insert_one(post_dict)
-    
-    # Enviar resposta automática para cada categoria selecionada
+    await collection_versions.bump(db, 'posts')
+    background_tasks.add_task(increment_post_counts, db, [post_dict])
+    # O evento leva o post no formato do feed: os clientes o inserem no topo sem recarregar a página
+    event_post = {key: value for key, value in post_dict.items() if key != '_id'}
+    await prepare_feed_posts([event_post])
+    event_post['created_at'] = post_dict['created_at']
+    background_tasks.add_task(publish_event, 'post_created', event_post)
+    
+    # Respostas automáticas (uma por categoria) são entregues depois da resposta
     if post_data.type == 'need':
-        for cat in categories_list:
-            auto_response = get_auto_response(cat)
-            if auto_response:
-                message_data = {
-                    'id': str(uuid.uuid4()),
-                    'from_user_id': 'system',
-                    'to_user_id': current_user.id,
-                    'message': f"{auto_response['title']}\n\n{auto_response['content']}",
-                    'created_at': datetime.now(timezone.utc).isoformat(),
-                    'is_auto_response': True
-                }
-                await db.messages.insert_one(message_data)
+        background_tasks.add_task(deliver_auto_responses, current_user.id, categories_list)
     
+    create_post_timing.add_since(started_at)
     return post
 
+async def deliver_auto_responses(user_id: str, categories: List[str]) -> None:
+    """Grava as mensagens automáticas de um post "need" com um único insert_many"""
+    started_at = time.perf_counter()
+    created_at = datetime.now(timezone.utc).isoformat()
+    messages = []
+    for cat in categories:
+        template = auto_response_catalog.reference(cat)
+        if template:
+            messages.append({
+                'id': str(uuid.uuid4()),
+                'conversation_id': conversation_id('system', user_id),
+                'from_user_id': 'system',
+                'to_user_id': user_id,
+                **template,
+                'created_at': created_at,
+                'is_auto_response': True
+            })
+    if not messages:
+        return
+    
+    try:
+        await db.messages.insert_many(messages, ordered=False)
+        await record_messages(db, messages)
+    except Exception as e:
+        logger.error(f"Auto-response delivery failed for user {user_id}: {e}")
+        return
+    auto_response_timing.add_since(started_at)
+    
+    for message in messages:
+        message.pop('_id', None)
+        await publish_event('message_received', auto_response_catalog.render(message), [user_id])
+
 @api_router.post("/posts/{post_id}/comments")
-async def add_comment(post_id: str, comment_data: PostCommentCreate, current_user: User = Depends(get_current_user)):
+async def add_comment(post_id: str, comment_data: PostCommentCreate, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
     comment = PostComment(
         post_id=post_id,
         user_id=current_user.id,
@@ -391,26 +683,110 @@ async def add_comment(post_id: str, comment_data: PostCommentCreate, current_use
     
     comment_dict = comment.model_dump()
     comment_dict['created_at'] = comment_dict['created_at'].isoformat()
+    comment_dict['author'] = author_snapshot(current_user)
     
     await db.comments.insert_one(comment_dict)
+    
+    # Contagem e prévia no post, atualizadas numa única operação atômica
+    preview = {field: comment_dict[field] for field in ['id', 'user_id', 'comment', 'created_at', 'author']}
+    await db.posts.update_one(
+        {'id': post_id},
+        {
+            '$inc': {'comment_count': 1},
+            '$push': {'latest_comments': {'$each': [preview], '$slice': -LATEST_COMMENTS_SIZE}}
+        }
+    )
+    await collection_versions.bump(db, 'posts')
+    
+    background_tasks.add_task(publish_event, 'comment_added', {
+        'post_id': post_id, 'comment_id': comment_dict['id'], 'user_id': current_user.id
+    })
     return comment
 
 @api_router.get("/posts/{post_id}/comments")
-async def get_comments(post_id: str):
-    comments = await db.comments.find({'post_id': post_id}, {'_id': 0}).sort('created_at', 1).to_list(1000)
+async def get_comments(
+    post_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(COMMENTS_PAGE_SIZE, ge=1, le=100)
+):
+    """Comentários do mais antigo para o mais recente, paginados por cursor sobre (created_at, id)"""
+    query = {'post_id': post_id}
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = and_filters(query, keyset_filter(['created_at', 'id'], after, descending=False))
+    
+    comments = await db.comments.find(query, {'_id': 0}).sort([('created_at', 1), ('id', 1)]).to_list(limit)
+    next_cursor = encode_cursor(comments[-1]['created_at'], comments[-1]['id']) if len(comments) == limit else None
+    
+    # Autores da página: snapshot ou uma única consulta em lote
+    await attach_authors(db, comments, use_display_name=False)
     
     for comment in comments:
         if isinstance(comment['created_at'], str):
             comment['created_at'] = datetime.fromisoformat(comment['created_at'])
-        
-        user = await db.users.find_one({'id': comment['user_id']}, {'_id': 0, 'password': 0, 'email': 0})
-        if user:
-            comment['user'] = {'name': user['name'], 'role': user['role']}
     
-    return comments
+    return {'comments': comments, 'next_cursor': next_cursor}
+
+def need_visibility_filter(role: str, help_categories: List[str]) -> Optional[dict]:
+    """
+    Voluntários e helpers só veem posts "need" de categorias que podem ajudar
+    (categories, ou category quando categories está vazio). Sem categorias definidas, veem tudo.
+    """
+    if role not in ['volunteer', 'helper'] or not help_categories:
+        return None
+    return {'$or': [
+        {'type': {'$ne': 'need'}},
+        {'categories': {'$in': help_categories}},
+        {
+            '$or': [{'categories': None}, {'categories': {'$size': 0}}],
+            'category': {'$in': help_categories}
+        }
+    ]}
+
+def post_visible_to(claims: TokenClaims, post: dict) -> bool:
+    """Mesma regra de need_visibility_filter, aplicada a um post já carregado"""
+    if post.get('type') != 'need' or claims.role not in ['volunteer', 'helper'] or not claims.help_categories:
+        return True
+    categories = post.get('categories') or [post.get('category')]
+    return any(cat in claims.help_categories for cat in categories)
+
+@api_router.get("/posts/category-counts")
+async def get_post_category_counts():
+    """Quantidade de posts por tipo e por categoria (contadores materializados, sem varrer db.posts)"""
+    counts = await get_post_counts(db)
+    return {'total': counts['total'], 'by_type': counts['by_type'], 'by_category': counts['by_category']}
 
 @api_router.get("/posts")
-async def get_posts(type: Optional[str] = None, category: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_posts(
+    request: Request,
+    response: Response,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(POSTS_PAGE_SIZE, ge=1, le=100),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(10.0, gt=0, le=200),
+    sort: str = Query('recent', pattern='^(recent|distance)$'),
+    claims: TokenClaims = Depends(get_token_claims)
+):
+    """
+    Feed paginado por cursor sobre (created_at, id), do mais recente para o mais antigo.
+    Com lat/lng, só posts dentro de radius_km; sort=distance ordena do mais próximo ao mais distante.
+    """
+    if (lat is None) != (lng is None):
+        raise HTTPException(status_code=400, detail="lat and lng must be provided together")
+    if sort == 'distance' and lat is None:
+        raise HTTPException(status_code=400, detail="sort=distance requires lat and lng")
+    
+    # A visibilidade depende da role e das categorias do usuário: entram no ETag
+    not_modified = conditional_etag(request, response, ['posts'], claims.role, claims.help_categories)
+    if not_modified:
+        return not_modified
+    
     query = {}
     if type:
         query['type'] = type
@@ -421,56 +797,304 @@ async def get_posts(type: Optional[str] = None, category: Optional[str] = None,
             {'categories': category}
         ]
     
-    posts = await db.posts.find(query, {'_id': 0}).sort('created_at', -1).to_list(100)
+    # Visibilidade por categoria aplicada no próprio MongoDB: a página vem sempre cheia
+    query = and_filters(query, need_visibility_filter(claims.role, claims.help_categories))
     
-    # Se o usuário é voluntário, marcar posts que ele pode ajudar baseado nas categorias
-    user_data = await db.users.find_one({'id': current_user.id}, {'_id': 0})
-    user_help_categories = user_data.get('help_categories', []) if user_data else []
+    if sort == 'distance':
+        posts, next_cursor = await get_nearest_posts(query, lng, lat, radius_km, cursor, limit)
+        await prepare_feed_posts(posts)
+        return {'posts': posts, 'next_cursor': next_cursor}
     
-    # Batch fetch all unique user_ids to avoid N+1 queries
-    user_ids = list(set(post['user_id'] for post in posts if post['user_id'] != 'system'))
-    users_dict = {}
-    if user_ids:
-        users_cursor = db.users.find({'id': {'$in': user_ids}}, {'_id': 0, 'password': 0, 'email': 0})
-        async for user in users_cursor:
-            users_dict[user['id']] = user
+    if lat is not None:
+        query = and_filters(query, {'geo': {'$geoWithin': {'$centerSphere': [[lng, lat], radius_km / EARTH_RADIUS_KM]}}})
+    
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = and_filters(query, keyset_filter(['created_at', 'id'], after))
+    
+    posts = await db.posts.find(query, {'_id': 0}).sort([('created_at', -1), ('id', -1)]).to_list(limit)
+    
+    # Página cheia: pode haver mais posts depois do último
+    next_cursor = encode_cursor(posts[-1]['created_at'], posts[-1]['id']) if len(posts) == limit else None
+    
+    await prepare_feed_posts(posts)
+    return {'posts': posts, 'next_cursor': next_cursor}
+
+async def get_nearest_posts(query: dict, lng: float, lat: float, radius_km: float, cursor: Optional[str], limit: int):
+    """Posts dentro do raio ordenados por distância; cursor sobre (distância em metros, id)"""
+    geo_near = {
+        'near': {'type': 'Point', 'coordinates': [lng, lat]},
+        'key': 'geo',
+        'distanceField': 'distance',
+        'maxDistance': radius_km * 1000,
+        'spherical': True,
+        'query': query
+    }
+    keyset = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        geo_near['minDistance'] = after[0]
+        keyset = keyset_filter(['distance', 'id'], after, descending=False)
+    
+    pipeline = [{'$geoNear': geo_near}]
+    if keyset:
+        pipeline.append({'$match': keyset})
+    pipeline += [{'$sort': {'distance': 1, 'id': 1}}, {'$limit': limit}, {'$project': {'_id': 0}}]
+    
+    posts = await db.posts.aggregate(pipeline).to_list(limit)
+    next_cursor = encode_cursor(posts[-1]['distance'], posts[-1]['id']) if len(posts) == limit else None
+    for post in posts:
+        post['distance'] = round(post['distance'] / 1000, 2)  # km, como em /helpers-nearby
+    return posts, next_cursor
+
+async def prepare_feed_posts(posts: list) -> None:
+    """Formata posts do feed/busca para a resposta (autor, datas, categorias)"""
+    # Autor vem do snapshot gravado no post (sem join)
+    await attach_authors(db, posts)
+    
+    # Prévias de comentários de todos os posts resolvidas de uma vez
+    previews = [comment for post in posts for comment in post.get('latest_comments') or []]
+    await attach_authors(db, previews, use_display_name=False)
+    for comment in previews:
+        if isinstance(comment['created_at'], str):
+            comment['created_at'] = datetime.fromisoformat(comment['created_at'])
     
-    filtered_posts = []
     for post in posts:
         if isinstance(post['created_at'], str):
             post['created_at'] = datetime.fromisoformat(post['created_at'])
         
+        # Posts anteriores à contagem materializada (ver migrations.py post_comment_previews)
+        post.setdefault('comment_count', 0)
+        post.setdefault('latest_comments', [])
+        
         if post['user_id'] == 'system':
             post['user'] = {'name': 'Watizat Assistant', 'role': 'assistant'}
-        else:
-            user = users_dict.get(post['user_id'])
-            if user:
-                display_name = user.get('display_name') if user.get('use_display_name') else user['name']
-                post['user'] = {'name': display_name, 'role': user['role']}
         
         # Garantir que posts tenham campo categories
         if 'categories' not in post or not post['categories']:
             post['categories'] = [post['category']] if post.get('category') else []
         
-        # Se é voluntário ou helper e o post é do tipo "need" (precisa de ajuda)
-        # só mostrar se alguma categoria do post está nas categorias que ele pode ajudar
-        if current_user.role in ['volunteer', 'helper']:
-            if post['type'] == 'need':
-                post_categories = post.get('categories', [post.get('category')])
-                # Se não tem categorias definidas ou alguma categoria do post está nas dele
-                if not user_help_categories or any(cat in user_help_categories for cat in post_categories):
-                    post['can_help'] = True
-                    filtered_posts.append(post)
-            else:
-                # Posts de oferta (type='offer') todos podem ver
-                post['can_help'] = True
-                filtered_posts.append(post)
-        else:
-            # Migrantes e outros usuários veem todos os posts
-            post['can_help'] = True
-            filtered_posts.append(post)
+        # Só chegam aqui posts visíveis para o usuário (ver need_visibility_filter)
+        post['can_help'] = True
+
+@api_router.get("/posts/search")
+async def search_posts(
+    q: str = Query(..., min_length=2, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    claims: TokenClaims = Depends(get_token_claims)
+):
+    """
+    Busca textual em título e descrição (índice de texto, sem distinção de acentos).
+    Ordena por relevância + bônus de recência; paginação por cursor sobre (rank, id).
+    """
+    if cursor:
+        try:
+            after_rank, after_id, now_iso = decode_cursor(cursor, 3)
+            now = datetime.fromisoformat(now_iso)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    else:
+        # O instante de referência fica no cursor para o rank não mudar entre páginas
+        now = datetime.now(timezone.utc)
+    
+    age_days = {'$divide': [
+        {'$subtract': [now, {'$dateFromString': {'dateString': '$created_at', 'onError': now, 'onNull': now}}]},
+        86400000
+    ]}
+    pipeline = [
+        {'$match': and_filters(
+            {'$text': {'$search': q}},
+            need_visibility_filter(claims.role, claims.help_categories)
+        )},
+        {'$project': {'_id': 0}},
+        {'$set': {'rank': {'$add': [
+            {'$meta': 'textScore'},
+            {'$divide': [SEARCH_RECENCY_WEIGHT, {'$add': [1, {'$divide': [age_days, SEARCH_RECENCY_HALF_LIFE_DAYS]}]}]}
+        ]}}}
+    ]
+    if cursor:
+        pipeline.append({'$match': keyset_filter(['rank', 'id'], [after_rank, after_id])})
+    pipeline += [{'$sort': {'rank': -1, 'id': -1}}, {'$limit': limit}]
+    
+    posts = await db.posts.aggregate(pipeline).to_list(limit)
+    
+    next_cursor = None
+    if len(posts) == limit:
+        next_cursor = encode_cursor(posts[-1]['rank'], posts[-1]['id'], now.isoformat())
+    
+    await prepare_feed_posts(posts)
+    return {'posts': posts, 'next_cursor': next_cursor}
+
+# ==================== TEMPO REAL (SSE) ====================
+
+def realtime_accepts(claims: TokenClaims, event: dict) -> bool:
+    if event['type'] == 'post_created':
+        return post_visible_to(claims, event['data'])
+    return True
+
+realtime_registry = ConnectionRegistry(
+    accepts=realtime_accepts,
+    max_queue=int(os.environ.get('REALTIME_MAX_QUEUE', '100'))
+)
+
+# 'mongo' (change streams, vários workers), 'local' (um único worker / testes) ou, sem a variável,
+# detectado na inicialização: change streams exigem replica set (ou mongos)
+REALTIME_BROKER = os.environ.get('REALTIME_BROKER', 'auto')
+if REALTIME_BROKER == 'local':
+    realtime_broker = LocalBroker()
+else:
+    realtime_broker = ChangeStreamBroker(db)
+
+async def supports_change_streams() -> bool:
+    hello = await db.command('isMaster')
+    return 'setName' in hello or hello.get('msg') == 'isdbgrid'
+
+async def publish_event(event_type: str, data: dict, audience: Optional[List[str]] = None) -> None:
+    """Publica após a resposta (BackgroundTasks); falhas não afetam a escrita original"""
+    try:
+        await realtime_broker.publish({'type': event_type, 'audience': audience, 'data': data})
+    except Exception as e:
+        logger.error(f"Realtime publish error ({event_type}): {e}")
+
+@api_router.get("/stream")
+async def event_stream(token: str):
+    """
+    Server-Sent Events: post_created, message_received, comment_added (e resync se o cliente atrasar).
+    EventSource não envia headers, por isso o access token vem na query string.
+    A conexão termina quando o token expira; o cliente reconecta com o token renovado.
+    """
+    payload = decode_token(token)
+    claims = await claims_from_payload(payload)
+    expires_at = payload.get('exp')
     
-    return filtered_posts
+    async def events():
+        connection = realtime_registry.connect(claims.id, claims)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                timeout = REALTIME_HEARTBEAT_SECONDS
+                if expires_at:
+                    remaining = expires_at - datetime.now(timezone.utc).timestamp()
+                    if remaining <= 0:
+                        break
+                    timeout = min(timeout, remaining)
+                try:
+                    event = await asyncio.wait_for(connection.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+        finally:
+            realtime_registry.disconnect(connection)
+    
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# ==================== CHAT (WEBSOCKET) ====================
+
+@api_router.websocket("/ws")
+async def chat_socket(websocket: WebSocket, token: str):
+    """
+    Gateway de chat. Usa o mesmo registro de conexões e broker do /api/stream.
+    Cliente -> servidor: {type: message|typing|delivered|read|ping, ...}
+    Servidor -> cliente: {type: <evento>, data: {...}}; 'sent' confirma a gravação (com client_id).
+    O access token vem na query string; o socket fecha (4401) quando ele expira.
+    """
+    try:
+        payload = decode_token(token)
+        claims = await claims_from_payload(payload)
+    except HTTPException:
+        await websocket.close(code=4401)
+        return
+    
+    await websocket.accept()
+    connection = realtime_registry.connect(claims.id, claims)
+    sender = asyncio.create_task(forward_socket_events(websocket, connection, payload.get('exp')))
+    try:
+        while True:
+            frame = await websocket.receive_json()
+            if not isinstance(frame, dict):
+                continue
+            reply = await handle_chat_frame(claims.id, frame)
+            if reply:
+                await connection.queue.put(reply)
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        sender.cancel()
+        realtime_registry.disconnect(connection)
+
+async def forward_socket_events(websocket: WebSocket, connection, expires_at: Optional[float]) -> None:
+    """Única tarefa que escreve no socket: eventos do broker e respostas aos frames do cliente"""
+    try:
+        while True:
+            timeout = None
+            if expires_at:
+                timeout = expires_at - datetime.now(timezone.utc).timestamp()
+                if timeout <= 0:
+                    break
+            try:
+                event = await asyncio.wait_for(connection.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            await websocket.send_text(json.dumps(
+                {key: value for key, value in event.items() if key != 'audience'}, default=str
+            ))
+        await websocket.close(code=4401)
+    except Exception:
+        pass  # socket já fechado: o loop de leitura encerra a conexão
+
+def frame_has_ids(frame: dict, *fields: str) -> bool:
+    """Ids vindos do cliente precisam ser strings (viram chaves de dicionário e audiência de eventos)"""
+    return all(isinstance(frame.get(field), str) and frame[field] for field in fields)
+
+async def handle_chat_frame(user_id: str, frame: dict) -> Optional[dict]:
+    """Frames malformados recebem um frame 'error'; nunca derrubam o socket"""
+    frame_type = frame.get('type')
+    
+    if frame_type == 'message':
+        data = frame.get('data')
+        try:
+            msg_data = DirectMessageCreate(**data) if isinstance(data, dict) else None
+        except ValidationError:
+            msg_data = None
+        if msg_data is None:
+            return {'type': 'error', 'data': {'client_id': frame.get('client_id'), 'detail': 'Invalid message'}}
+        msg_dict = await store_direct_message(user_id, msg_data)
+        await publish_event('message_received', msg_dict, [msg_data.to_user_id, user_id])
+        return {'type': 'sent', 'data': {'client_id': frame.get('client_id'), 'message': msg_dict}}
+    
+    if frame_type == 'typing' and frame_has_ids(frame, 'to_user_id'):
+        await publish_event('typing', {'from_user_id': user_id}, [frame['to_user_id']])
+        return None
+    
+    if frame_type == 'delivered' and frame_has_ids(frame, 'to_user_id', 'message_id'):
+        # Confirmação de entrega vai para quem enviou a mensagem
+        await publish_event('delivered', {'message_id': frame['message_id'], 'by_user_id': user_id}, [frame['to_user_id']])
+        return None
+    
+    if frame_type == 'read' and frame_has_ids(frame, 'partner_id'):
+        try:
+            read_until = normalize_read_until(frame.get('read_until'))
+        except (ValueError, TypeError):
+            return {'type': 'error', 'data': {'detail': 'Invalid read_until'}}
+        read_receipts.mark(user_id, frame['partner_id'], read_until)
+        return None
+    
+    if frame_type == 'ping':
+        return {'type': 'pong', 'data': {}}
+    
+    return {'type': 'error', 'data': {'detail': f"Unknown frame type: {frame_type}"}}
 
 @api_router.get("/services")
 async def get_services(category: Optional[str] = None):
@@ -603,22 +1227,19 @@ async def admin_stats(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin only")
     
     total_users = await db.users.count_documents({})
-    total_posts = await db.posts.count_documents({})
+    post_counts = await get_post_counts(db)
+    total_posts = post_counts['total']
     total_matches = await db.matches.count_documents({})
     total_volunteers = await db.users.count_documents({'role': 'volunteer'})
     total_migrants = await db.users.count_documents({'role': 'migrant'})
     total_messages = await db.messages.count_documents({})
     
-    # Posts por categoria
-    posts_by_category = {}
+    # Posts por categoria (principal) e por tipo, dos contadores materializados
     categories = ['food', 'legal', 'health', 'housing', 'work', 'education', 'social', 'clothes', 'furniture', 'transport']
-    for cat in categories:
-        count = await db.posts.count_documents({'category': cat})
-        posts_by_category[cat] = count
+    posts_by_category = {cat: post_counts['by_primary_category'].get(cat, 0) for cat in categories}
     
-    # Posts por tipo
-    needs_count = await db.posts.count_documents({'type': 'need'})
-    offers_count = await db.posts.count_documents({'type': 'offer'})
+    needs_count = post_counts['by_type'].get('need', 0)
+    offers_count = post_counts['by_type'].get('offer', 0)
     
     return {
         'total_users': total_users,
@@ -632,6 +1253,22 @@ async def admin_stats(current_user: User = Depends(get_current_user)):
         'offers_count': offers_count
     }
 
+@api_router.get("/admin/metrics")
+async def admin_metrics(current_user: User = Depends(get_current_user)):
+    """Métricas internas do worker (cache de usuários, pool de bcrypt, latências)"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return {
+        'user_cache': user_cache.stats(),
+        'password_hashing': password_hasher.stats(),
+        'token_revocation': revoked_tokens.stats(),
+        'realtime': realtime_registry.stats(),
+        'create_post': create_post_timing.as_dict(),
+        'auto_response_delivery': auto_response_timing.as_dict(),
+        'read_receipts': read_receipts.stats()
+    }
+
 @api_router.get("/admin/users")
 async def admin_get_users(current_user: User = Depends(get_current_user)):
     if current_user.role != 'admin':
@@ -645,28 +1282,37 @@ async def admin_get_users(current_user: User = Depends(get_current_user)):
     
     return users
 
+@api_router.post("/admin/users/import")
+async def admin_import_users(request: Request, format: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """
+    Importa usuários em massa (corpo CSV ou NDJSON).
+    Responde em NDJSON com eventos de progresso e de erro por linha.
+    """
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    body = (await request.body()).decode('utf-8-sig')
+    fmt = format or detect_format(content_type=request.headers.get('content-type', ''))
+    if fmt not in ['csv', 'ndjson']:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    
+    async def events():
+        async for event in import_users(db, parse_rows(body, fmt), rounds=password_hasher.rounds):
+            yield json.dumps(event) + '\n'
+    
+    return StreamingResponse(events(), media_type='application/x-ndjson')
+
 @api_router.get("/admin/posts")
 async def admin_get_posts(current_user: User = Depends(get_current_user)):
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Admin only")
     
     posts = await db.posts.find({}, {'_id': 0}).sort('created_at', -1).to_list(1000)
-    
-    # Batch fetch all unique user_ids to avoid N+1 queries
-    user_ids = list(set(post['user_id'] for post in posts if post.get('user_id')))
-    users_dict = {}
-    if user_ids:
-        users_cursor = db.users.find({'id': {'$in': user_ids}}, {'_id': 0, 'password': 0, 'email': 0})
-        async for user in users_cursor:
-            users_dict[user['id']] = user
+    await attach_authors(db, posts, use_display_name=False)
     
     for post in posts:
         if isinstance(post.get('created_at'), str):
             post['created_at'] = datetime.fromisoformat(post['created_at'])
-        # Get user info from batch
-        user = users_dict.get(post.get('user_id'))
-        if user:
-            post['user'] = {'name': user['name'], 'role': user['role']}
     
     return posts
 
@@ -680,12 +1326,19 @@ async def admin_delete_user(user_id: str, current_user: User = Depends(get_curre
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
     result = await db.users.delete_one({'id': user_id})
+    user_cache.invalidate(user_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    await revoked_tokens.revoke(db, user_id, REVOKE_ALL)
     
     # Also delete user's posts and messages
+    counted_fields = {'_id': 0, 'type': 1, 'category': 1, 'categories': 1}
+    user_posts = await db.posts.find({'user_id': user_id}, counted_fields).to_list(None)
     await db.posts.delete_many({'user_id': user_id})
+    await collection_versions.bump(db, 'posts')
+    await increment_post_counts(db, user_posts, -1)
     await db.messages.delete_many({'$or': [{'from_user_id': user_id}, {'to_user_id': user_id}]})
+    await db.conversations.delete_many({'$or': [{'user_id': user_id}, {'partner_id': user_id}]})
     
     return {'message': 'User deleted successfully'}
 
@@ -694,9 +1347,14 @@ async def admin_delete_post(post_id: str, current_user: User = Depends(get_curre
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Admin only")
     
-    result = await db.posts.delete_one({'id': post_id})
-    if result.deleted_count == 0:
+    post = await db.posts.find_one_and_delete(
+        {'id': post_id},
+        projection={'_id': 0, 'type': 1, 'category': 1, 'categories': 1}
+    )
+    if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
+    await collection_versions.bump(db, 'posts')
+    await increment_post_counts(db, [post], -1)
     
     # Also delete comments
     await db.comments.delete_many({'post_id': post_id})
@@ -704,7 +1362,7 @@ async def admin_delete_post(post_id: str, current_user: User = Depends(get_curre
     return {'message': 'Post deleted successfully'}
 
 @api_router.put("/admin/users/{user_id}/role")
-async def admin_update_user_role(user_id: str, role_data: dict, current_user: User = Depends(get_current_user)):
+async def admin_update_user_role(user_id: str, role_data: dict, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Admin only")
     
@@ -713,9 +1371,15 @@ async def admin_update_user_role(user_id: str, role_data: dict, current_user: Us
         raise HTTPException(status_code=400, detail="Invalid role")
     
     result = await db.users.update_one({'id': user_id}, {'$set': {'role': new_role}})
+    user_cache.invalidate(user_id)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # A role vai no access token: os access tokens atuais deixam de valer e o cliente
+    # obtém um novo via /auth/refresh (o refresh token continua válido, sem logout)
+    await revoke_user_claims(user_id)
+    background_tasks.add_task(refresh_author_snapshots, user_id, {'role': new_role})
+    
     return {'message': 'Role updated successfully'}
 
 class DirectMessage(BaseModel):
@@ -734,87 +1398,181 @@ class DirectMessageCreate(BaseModel):
     media_type: Optional[str] = None
 
 @api_router.post("/messages")
-async def send_message(msg_data: DirectMessageCreate, current_user: User = Depends(get_current_user)):
+async def send_message(msg_data: DirectMessageCreate, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
+    msg_dict = await store_direct_message(current_user.id, msg_data)
+    # Remetente também recebe: outras abas/dispositivos dele
+    background_tasks.add_task(publish_event, 'message_received', msg_dict, [msg_dict['to_user_id'], current_user.id])
+    return DirectMessage(**msg_dict)
+
+async def store_direct_message(from_user_id: str, msg_data: DirectMessageCreate) -> dict:
+    """Grava a mensagem e atualiza a caixa de entrada (POST /messages e /ws)"""
     message = DirectMessage(
-        from_user_id=current_user.id,
+        from_user_id=from_user_id,
         to_user_id=msg_data.to_user_id,
         message=msg_data.message
     )
     
     msg_dict = message.model_dump()
+    msg_dict['conversation_id'] = conversation_id(message.from_user_id, message.to_user_id)
     msg_dict['created_at'] = msg_dict['created_at'].isoformat()
     msg_dict['location'] = msg_data.location
     msg_dict['media'] = msg_data.media or []
     msg_dict['media_type'] = msg_data.media_type
     
     await db.messages.insert_one(msg_dict)
-    return message
+    msg_dict.pop('_id', None)
+    await record_messages(db, [msg_dict])
+    return msg_dict
+
+class MarkReadRequest(BaseModel):
+    read_until: Optional[str] = None  # created_at da última mensagem exibida; padrão: agora
+
+@api_router.post("/messages/{other_user_id}/read")
+async def mark_messages_read(
+    other_user_id: str,
+    data: Optional[MarkReadRequest] = None,
+    claims: TokenClaims = Depends(get_token_claims)
+):
+    """Marca a conversa como lida até read_until (gravado no próximo flush de read_receipts)"""
+    try:
+        read_until = normalize_read_until(data.read_until if data else None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid read_until")
+    
+    read_receipts.mark(claims.id, other_user_id, read_until)
+    return {'read_until': read_until}
+
+def normalize_read_until(value: Optional[str]) -> str:
+    """ISO em UTC no mesmo formato de created_at (comparado como string); ValueError se inválido"""
+    if not value:
+        return datetime.now(timezone.utc).isoformat()
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat()
+
+@api_router.get("/messages/unread-count")
+async def get_unread_count(claims: TokenClaims = Depends(get_token_claims)):
+    """Total de mensagens não lidas (badge), só das conversas com pendências"""
+    query = {'user_id': claims.id, 'unread_count': {'$gt': 0}}
+    # Leituras deste usuário ainda no buffer já contam como lidas
+    pending = read_receipts.pending_partners(claims.id)
+    if pending:
+        query['partner_id'] = {'$nin': pending}
+    
+    result = await db.conversations.aggregate([
+        {'$match': query},
+        {'$group': {'_id': None, 'unread_count': {'$sum': '$unread_count'}, 'conversations': {'$sum': 1}}}
+    ]).to_list(1)
+    if not result:
+        return {'unread_count': 0, 'conversations': 0}
+    return {'unread_count': result[0]['unread_count'], 'conversations': result[0]['conversations']}
+
+async def publish_read_receipt(user_id: str, partner_id: str, read_until: str) -> None:
+    """Avisa a outra ponta (após o flush) até onde a conversa foi lida"""
+    if partner_id != 'system':
+        await publish_event('read', {'by_user_id': user_id, 'read_until': read_until}, [partner_id])
 
 @api_router.get("/messages/{other_user_id}")
-async def get_messages(other_user_id: str, current_user: User = Depends(get_current_user)):
-    messages = await db.messages.find({
-        '$or': [
-            {'from_user_id': current_user.id, 'to_user_id': other_user_id},
-            {'from_user_id': other_user_id, 'to_user_id': current_user.id}
-        ]
-    }, {'_id': 0}).sort('created_at', 1).to_list(1000)
+async def get_messages(
+    other_user_id: str,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(MESSAGES_PAGE_SIZE, ge=1, le=200),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Histórico paginado por cursor sobre (created_at, id), sempre em ordem cronológica na página.
+    Sem cursor: as mensagens mais recentes. before: página anterior (rolar para cima).
+    after: só as mensagens mais novas que o cursor (o que chegou desde a última leitura).
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    
+    query = {'conversation_id': conversation_id(current_user.id, other_user_id)}
+    if legacy_messages_pending:
+        # Mensagens ainda sem conversation_id (até rodar migrations.py message_conversation_ids)
+        query = {'$or': [query, {
+            'conversation_id': None,
+            '$or': [
+                {'from_user_id': current_user.id, 'to_user_id': other_user_id},
+                {'from_user_id': other_user_id, 'to_user_id': current_user.id}
+            ]
+        }]}
+    
+    anchor = before or after
+    if anchor:
+        try:
+            anchor_values = decode_cursor(anchor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = and_filters(query, keyset_filter(['created_at', 'id'], anchor_values, descending=bool(before)))
     
+    if after:
+        messages = await db.messages.find(query, {'_id': 0}).sort([('created_at', 1), ('id', 1)]).to_list(limit)
+    else:
+        # Mais recentes primeiro no banco; a página volta em ordem cronológica
+        messages = await db.messages.find(query, {'_id': 0}).sort([('created_at', -1), ('id', -1)]).to_list(limit)
+        messages.reverse()
+    
+    # created_at segue como string ISO (sem conversão por mensagem)
     for msg in messages:
-        if isinstance(msg['created_at'], str):
-            msg['created_at'] = datetime.fromisoformat(msg['created_at'])
+        auto_response_catalog.render(msg)
     
-    return messages
+    full_page = len(messages) == limit
+    oldest, newest = (messages[0], messages[-1]) if messages else (None, None)
+    return {
+        'messages': messages,
+        # Página anterior: só se esta veio cheia ao rolar para trás (ou na primeira carga)
+        'before_cursor': encode_cursor(oldest['created_at'], oldest['id']) if oldest and full_page and not after else None,
+        # Para buscar o que chegar depois; sem mensagens novas, mantém o cursor recebido
+        'after_cursor': encode_cursor(newest['created_at'], newest['id']) if newest else after,
+        'has_more_after': bool(after) and full_page
+    }
 
 @api_router.get("/conversations")
-async def get_conversations(current_user: User = Depends(get_current_user)):
-    messages = await db.messages.find({
-        '$or': [
-            {'from_user_id': current_user.id},
-            {'to_user_id': current_user.id}
-        ]
-    }, {'_id': 0}).to_list(10000)
+async def get_conversations(
+    cursor: Optional[str] = None,
+    limit: int = Query(CONVERSATIONS_PAGE_SIZE, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Caixa de entrada: conversas da mais recente para a mais antiga (db.conversations)"""
+    query = {'user_id': current_user.id}
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = and_filters(query, keyset_filter(['last_message_at', 'partner_id'], after))
     
-    user_ids = set()
-    for msg in messages:
-        if msg['from_user_id'] != current_user.id:
-            user_ids.add(msg['from_user_id'])
-        if msg['to_user_id'] != current_user.id:
-            user_ids.add(msg['to_user_id'])
+    page = await db.conversations.find(query, {'_id': 0}).sort(
+        [('last_message_at', -1), ('partner_id', -1)]
+    ).to_list(limit)
+    next_cursor = encode_cursor(page[-1]['last_message_at'], page[-1]['partner_id']) if len(page) == limit else None
     
-    # Batch fetch all users to avoid N+1 queries
-    user_ids_list = list(user_ids)
+    partner_ids = [conv['partner_id'] for conv in page if conv['partner_id'] != 'system']
     users_dict = {}
-    if user_ids_list:
-        users_cursor = db.users.find({'id': {'$in': user_ids_list}}, {'_id': 0, 'password': 0})
-        async for user in users_cursor:
+    if partner_ids:
+        async for user in db.users.find({'id': {'$in': partner_ids}}, {'_id': 0, 'password': 0}):
+            if isinstance(user.get('created_at'), str):
+                user['created_at'] = datetime.fromisoformat(user['created_at'])
             users_dict[user['id']] = user
-    
-    # Get last messages for each conversation in batch
-    last_messages = {}
-    for uid in user_ids_list:
-        relevant_msgs = [m for m in messages if 
-            (m['from_user_id'] == uid and m['to_user_id'] == current_user.id) or
-            (m['from_user_id'] == current_user.id and m['to_user_id'] == uid)]
-        if relevant_msgs:
-            # Sort by created_at and get last one
-            sorted_msgs = sorted(relevant_msgs, key=lambda x: x.get('created_at', ''), reverse=True)
-            last_messages[uid] = sorted_msgs[0]
+    users_dict['system'] = {'id': 'system', 'name': 'Watizat Assistant', 'role': 'assistant'}
     
     conversations = []
-    for uid in user_ids:
-        user = users_dict.get(uid)
-        if user:
-            if isinstance(user.get('created_at'), str):
-                user['created_at'] = datetime.fromisoformat(user['created_at'])
-            
-            last_msg = last_messages.get(uid)
-            conversations.append({
-                'user': user,
-                'last_message': last_msg['message'] if last_msg else '',
-                'last_message_time': last_msg['created_at'] if last_msg else None
-            })
+    for conv in page:
+        user = users_dict.get(conv['partner_id'])
+        if not user:
+            continue  # usuário excluído
+        last_msg = auto_response_catalog.render(conv.get('last_message') or {})
+        conversations.append({
+            'user': user,
+            'last_message': (last_msg.get('message') or '')[:PREVIEW_LENGTH],
+            'last_message_time': datetime.fromisoformat(conv['last_message_at']) if conv.get('last_message_at') else None,
+            'unread_count': conv.get('unread_count', 0)
+        })
     
-    return conversations
+    return {'conversations': conversations, 'next_cursor': next_cursor}
 
 @api_router.get("/users/{user_id}")
 async def get_user_by_id(user_id: str, current_user: User = Depends(get_current_user)):
@@ -828,7 +1586,7 @@ async def get_user_by_id(user_id: str, current_user: User = Depends(get_current_
     return user
 
 @api_router.get("/can-chat/{other_user_id}")
-async def can_chat_with_user(other_user_id: str, current_user: User = Depends(get_current_user)):
+async def can_chat_with_user(other_user_id: str, claims: TokenClaims = Depends(get_token_claims)):
     """
     Verifica se o usuário atual pode iniciar chat com outro usuário.
     Para voluntários e helpers, só podem conversar com migrantes se tiverem categorias de ajuda compatíveis.
@@ -837,15 +1595,13 @@ async def can_chat_with_user(other_user_id: str, current_user: User = Depends(ge
     if not other_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    current_user_data = await db.users.find_one({'id': current_user.id}, {'_id': 0})
-    
     # Migrantes podem conversar com qualquer voluntário ou helper
-    if current_user.role == 'migrant':
+    if claims.role == 'migrant':
         return {'can_chat': True, 'reason': 'allowed'}
     
     # Voluntários e helpers só podem conversar com migrantes se tiverem categorias compatíveis
-    if current_user.role in ['volunteer', 'helper'] and other_user.get('role') == 'migrant':
-        helper_categories = current_user_data.get('help_categories', []) if current_user_data else []
+    if claims.role in ['volunteer', 'helper'] and other_user.get('role') == 'migrant':
+        helper_categories = claims.help_categories
         
         if not helper_categories:
             # Se não definiu categorias, permitir chat (legacy)
@@ -957,6 +1713,7 @@ async def update_location(location_data: dict, current_user: User = Depends(get_
     }
     
     await db.users.update_one({'id': current_user.id}, {'$set': update})
+    user_cache.invalidate(current_user.id)
     return {'message': 'Location updated successfully'}
 
 # ==================== HELP LOCATIONS ENDPOINTS ====================
@@ -1133,8 +1890,12 @@ async def seed_help_locations():
 # ==================== ADVERTISEMENTS ENDPOINTS ====================
 
 @api_router.get("/advertisements")
-async def get_advertisements(type: Optional[str] = None, active_only: bool = True):
+async def get_advertisements(request: Request, response: Response, type: Optional[str] = None, active_only: bool = True):
     """Retorna anúncios/divulgações para exibir na sidebar"""
+    not_modified = conditional_etag(request, response, ['advertisements'])
+    if not_modified:
+        return not_modified
+    
     query = {}
     if type:
         query['type'] = type
@@ -1154,6 +1915,7 @@ async def create_advertisement(ad_data: AdvertisementCreate, current_user: User
     ad_dict = ad.model_dump()
     
     await db.advertisements.insert_one(ad_dict)
+    await collection_versions.bump(db, 'advertisements')
     return {'message': 'Anúncio criado com sucesso', 'id': ad.id}
 
 @api_router.get("/admin/advertisements")
@@ -1178,6 +1940,7 @@ async def update_advertisement(ad_id: str, ad_data: dict, current_user: User = D
     result = await db.advertisements.update_one({'id': ad_id}, {'$set': ad_data})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Anúncio não encontrado")
+    await collection_versions.bump(db, 'advertisements')
     
     return {'message': 'Anúncio atualizado com sucesso'}
 
@@ -1190,6 +1953,7 @@ async def delete_advertisement(ad_id: str, current_user: User = Depends(get_curr
     result = await db.advertisements.delete_one({'id': ad_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Anúncio não encontrado")
+    await collection_versions.bump(db, 'advertisements')
     
     return {'message': 'Anúncio excluído com sucesso'}
 
@@ -1271,6 +2035,7 @@ async def seed_advertisements():
     
     for ad in default_ads:
         await db.advertisements.insert_one(ad)
+    await collection_versions.bump(db, 'advertisements')
     
     return {'message': f'{len(default_ads)} anúncios criados com sucesso', 'seeded': True}
 
@@ -1362,8 +2127,12 @@ class MuralMessageCreate(BaseModel):
     message: str = Field(..., min_length=5, max_length=500)
 
 @api_router.get("/mural")
-async def get_mural_messages(limit: int = 20):
+async def get_mural_messages(request: Request, response: Response, limit: int = 20):
     """Retorna as mensagens aprovadas do mural"""
+    not_modified = conditional_etag(request, response, ['mural_messages'])
+    if not_modified:
+        return not_modified
+    
     messages = await db.mural_messages.find(
         {'approved': True}, 
         {'_id': 0}
@@ -1384,6 +2153,7 @@ async def create_mural_message(msg_data: MuralMessageCreate):
     msg_dict['created_at'] = msg_dict['created_at'].isoformat()
     
     await db.mural_messages.insert_one(msg_dict)
+    await collection_versions.bump(db, 'mural_messages')
     return {'message': 'Mensagem enviada com sucesso!', 'id': message.id}
 
 @api_router.get("/admin/mural")
@@ -1404,6 +2174,7 @@ async def approve_mural_message(msg_id: str, current_user: User = Depends(get_cu
     result = await db.mural_messages.update_one({'id': msg_id}, {'$set': {'approved': True}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Mensagem não encontrada")
+    await collection_versions.bump(db, 'mural_messages')
     
     return {'message': 'Mensagem aprovada'}
 
@@ -1416,6 +2187,7 @@ async def delete_mural_message(msg_id: str, current_user: User = Depends(get_cur
     result = await db.mural_messages.delete_one({'id': msg_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Mensagem não encontrada")
+    await collection_versions.bump(db, 'mural_messages')
     
     return {'message': 'Mensagem excluída'}
 
@@ -1815,7 +2587,7 @@ async def auto_post_jobs(limit: int = 5):
     jobs_data = await search_jobs(query="emploi", location="France", page=1)
     jobs = jobs_data.get('jobs', [])
     
-    posted_count = 0
+    posted = []
     for job in jobs[:limit]:
         # Verificar se já foi postado
         existing = await db.posts.find_one({'job_id': job.get('id')})
@@ -1850,7 +2622,12 @@ async def auto_post_jobs(limit: int = 5):
         }
         
         await db.posts.insert_one(post_dict)
-        posted_count += 1
+        posted.append(post_dict)
+    
+    posted_count = len(posted)
+    if posted_count:
+        await collection_versions.bump(db, 'posts')
+        await increment_post_counts(db, posted)
     
     return {'message': f'{posted_count} vagas postadas no feed', 'count': posted_count}
 
@@ -1974,11 +2751,17 @@ async def get_personalized_jobs(current_user: User = Depends(get_current_user)):
 
 @api_router.get("/housing")
 async def get_housing_listings(
+    request: Request,
+    response: Response,
     type: Optional[str] = None,
     city: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
     """Lista anúncios de hospedagem com filtros opcionais"""
+    not_modified = conditional_etag(request, response, ['housing_listings'])
+    if not_modified:
+        return not_modified
+    
     query = {'listing_status': 'active'}
     
     if type and type != 'all':
@@ -1989,16 +2772,20 @@ async def get_housing_listings(
     
     listings = await db.housing_listings.find(query, {'_id': 0}).sort('created_at', -1).to_list(100)
     
-    # Adicionar info do usuário a cada listing
+    # A lista só leva dados cobertos pelo ETag de housing_listings: o nome vem do snapshot do autor
+    # (reescrito com bump da versão quando muda); verificação e avaliações ficam no detalhe (/housing/{id})
+    missing_ids = list({listing['user_id'] for listing in listings if not listing.get('author')})
+    names = {}
+    if missing_ids:
+        async for user in db.users.find({'id': {'$in': missing_ids}}, {'_id': 0, 'id': 1, 'name': 1}):
+            names[user['id']] = user.get('name')
+    
     for listing in listings:
-        user = await db.users.find_one({'id': listing['user_id']}, {'_id': 0, 'password': 0})
-        if user:
+        author = listing.pop('author', None)
+        if author or listing['user_id'] in names:
             listing['user'] = {
-                'id': user.get('id'),
-                'name': user.get('name'),
-                'verified': user.get('verified', False),
-                'rating': user.get('rating', 4.5),
-                'reviews_count': user.get('reviews_count', 0)
+                'id': listing['user_id'],
+                'name': author.get('name') if author else names[listing['user_id']]
             }
     
     return listings
@@ -2027,7 +2814,10 @@ async def create_housing_listing(
         photos=listing_data.photos
     )
     
-    await db.housing_listings.insert_one(listing.model_dump())
+    listing_dict = listing.model_dump()
+    listing_dict['author'] = author_snapshot(current_user)
+    await db.housing_listings.insert_one(listing_dict)
+    await collection_versions.bump(db, 'housing_listings')
     
     return {'message': 'Anúncio criado com sucesso', 'id': listing.id}
 
@@ -2037,7 +2827,8 @@ async def get_housing_listing(
     current_user: User = Depends(get_current_user)
 ):
     """Retorna detalhes de um anúncio específico"""
-    listing = await db.housing_listings.find_one({'id': listing_id}, {'_id': 0})
+    # O detalhe já consulta o usuário completo (email, telefone): o snapshot não é necessário
+    listing = await db.housing_listings.find_one({'id': listing_id}, {'_id': 0, 'author': 0})
     
     if not listing:
         raise HTTPException(status_code=404, detail="Anúncio não encontrado")
@@ -2079,6 +2870,7 @@ async def update_housing_listing(
         {'id': listing_id},
         {'$set': update_data}
     )
+    await collection_versions.bump(db, 'housing_listings')
     
     return {'message': 'Anúncio atualizado com sucesso'}
 
@@ -2097,6 +2889,7 @@ async def delete_housing_listing(
         raise HTTPException(status_code=403, detail="Sem permissão para remover este anúncio")
     
     await db.housing_listings.delete_one({'id': listing_id})
+    await collection_versions.bump(db, 'housing_listings')
     
     return {'message': 'Anúncio removido com sucesso'}
 
@@ -2119,6 +2912,7 @@ async def update_housing_status(
         {'id': listing_id},
         {'$set': {'listing_status': new_status, 'updated_at': datetime.now(timezone.utc).isoformat()}}
     )
+    await collection_versions.bump(db, 'housing_listings')
     
     return {'message': f'Status atualizado para {new_status}'}
 
@@ -2149,6 +2943,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_tasks():
+    global legacy_messages_pending, realtime_broker
+    await ensure_indexes(db)
+    legacy_messages_pending = await db.messages.find_one(LEGACY_MESSAGES_FILTER, {'_id': 1}) is not None
+    if 'BCRYPT_ROUNDS' not in os.environ:
+        rounds = await password_hasher.load_or_calibrate(db, PASSWORD_HASH_BUDGET_MS)
+        logger.info(f"bcrypt cost calibrated to {rounds} rounds ({PASSWORD_HASH_BUDGET_MS} ms budget)")
+    await revoked_tokens.load(db)
+    revoked_tokens.start(db)
+    await collection_versions.load(db)
+    collection_versions.start(db)
+    if REALTIME_BROKER == 'auto' and not await supports_change_streams():
+        logger.warning("MongoDB standalone (sem replica set): usando o broker local; "
+                       "eventos em tempo real só chegam aos clientes conectados no mesmo worker")
+        realtime_broker = LocalBroker()
+    realtime_broker.start(realtime_registry.dispatch)
+    post_counter_reconciler.start(db)
+    read_receipts.start(db, publish_read_receipt)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    revoked_tokens.stop()
+    collection_versions.stop()
+    realtime_broker.stop()
+    post_counter_reconciler.stop()
+    read_receipts.stop()
+    try:
+        await read_receipts.flush(db)
+    except Exception as e:
+        logger.error(f"Read receipts final flush error: {e}")
     client.close()
+    password_hasher.shutdown()
@@ -0,0 +1,28 @@
+"""
+Estatísticas simples de latência (contagem, média e máximo) expostas em /api/admin/metrics
+"""
+
+import time
+
+
+class TimingStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def add_since(self, started_at: float) -> None:
+        """started_at vindo de time.perf_counter()"""
+        self.add((time.perf_counter() - started_at) * 1000)
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2)
+        }
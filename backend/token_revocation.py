@@ -0,0 +1,84 @@
+"""
+Revogação de tokens por versão
+  - token_version (tv): access e refresh tokens (logout, exclusão do usuário)
+  - claims_version (cv): só access tokens, quando as claims mudam (ex: role); o refresh token
+    continua válido e emite um access token com as claims novas
+Mantém em memória a menor versão válida por usuário, recarregada periodicamente do MongoDB
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+# Versão usada para revogar permanentemente (ex: usuário excluído)
+REVOKE_ALL = 2 ** 31 - 1
+
+
+class RevokedTokenVersions:
+    def __init__(self, refresh_seconds: float = 30.0):
+        self.refresh_seconds = refresh_seconds
+        # user_id -> menor token_version ainda aceita (só usuários com revogações)
+        self._min_versions = {}
+        # user_id -> menor claims_version ainda aceita em access tokens
+        self._min_claims_versions = {}
+        self._task = None
+
+    def is_revoked(self, user_id: str, token_version: int, claims_version: int = None) -> bool:
+        """claims_version só é informada para access tokens"""
+        if token_version < self._min_versions.get(user_id, 0):
+            return True
+        return claims_version is not None and claims_version < self._min_claims_versions.get(user_id, 0)
+
+    async def revoke(self, db, user_id: str, min_version: int) -> None:
+        """Registra a revogação no MongoDB e aplica imediatamente neste worker"""
+        self._min_versions[user_id] = max(min_version, self._min_versions.get(user_id, 0))
+        await db.token_revocations.update_one(
+            {'user_id': user_id},
+            {
+                '$max': {'min_version': min_version},
+                '$set': {'updated_at': datetime.now(timezone.utc)}
+            },
+            upsert=True
+        )
+
+    async def revoke_claims(self, db, user_id: str, min_claims_version: int) -> None:
+        """Invalida só os access tokens com claims antigas"""
+        self._min_claims_versions[user_id] = max(min_claims_version, self._min_claims_versions.get(user_id, 0))
+        await db.token_revocations.update_one(
+            {'user_id': user_id},
+            {
+                '$max': {'min_claims_version': min_claims_version},
+                '$set': {'updated_at': datetime.now(timezone.utc)}
+            },
+            upsert=True
+        )
+
+    async def load(self, db) -> None:
+        """Recarrega o conjunto completo (revogações feitas por outros workers)"""
+        projection = {'_id': 0, 'user_id': 1, 'min_version': 1, 'min_claims_version': 1}
+        async for doc in db.token_revocations.find({}, projection):
+            user_id = doc['user_id']
+            self._min_versions[user_id] = max(doc.get('min_version', 0), self._min_versions.get(user_id, 0))
+            self._min_claims_versions[user_id] = max(
+                doc.get('min_claims_version', 0), self._min_claims_versions.get(user_id, 0)
+            )
+
+    async def _refresh_loop(self, db) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.load(db)
+            except Exception as e:
+                logging.error(f"Token revocation refresh error: {e}")
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(db))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {'revoked_users': len(self._min_versions), 'refresh_seconds': self.refresh_seconds}
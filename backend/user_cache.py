@@ -0,0 +1,66 @@
+"""
+Cache em memória de usuários autenticados (TTL + LRU)
+Evita uma consulta ao MongoDB por requisição em get_current_user
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class UserCache:
+    def __init__(self, max_size: int = 1000, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str, version: Optional[int] = None) -> Optional[Any]:
+        """
+        Retorna o usuário em cache ou None se ausente/expirado.
+        Com version, uma entrada gravada com outra versão também conta como ausente.
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, entry_version, user = entry
+        if expires_at < time.monotonic() or (version is not None and entry_version != version):
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        # Mais recentemente usado vai para o final
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def set(self, user_id: str, user: Any, version: int = 0) -> None:
+        """Armazena o usuário, removendo o menos usado se o cache estiver cheio"""
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, version, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        """Remove o usuário do cache (chamar após qualquer escrita em db.users)"""
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,91 @@
+"""
+Teste de carga do gateway de chat (/api/ws)
+Abre N sockets com o mesmo access token, envia mensagens para o próprio usuário e mede
+quanto tempo cada mensagem leva para chegar a todos os sockets (message_received).
+Uso: python ws_load_test.py --url ws://localhost:8001/api/ws --token <access token> [--connections 2000] [--messages 20]
+Com vários workers, rode o servidor num replica set (REALTIME_BROKER=mongo) para medir também o change stream.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+import jwt
+import websockets
+
+
+async def open_socket(url: str, token: str):
+    return await websockets.connect(f"{url}?token={token}", max_queue=None, open_timeout=30)
+
+
+async def wait_for_message(socket, message_ids: set, arrivals: dict) -> None:
+    """Registra o instante em que cada mensagem do teste chega a este socket"""
+    while len(arrivals) < len(message_ids):
+        frame = json.loads(await socket.recv())
+        if frame['type'] == 'message_received' and frame['data']['id'] in message_ids:
+            arrivals[frame['data']['id']] = time.perf_counter()
+
+
+async def main(url: str, token: str, connections: int, messages: int) -> int:
+    user_id = jwt.decode(token, options={'verify_signature': False})['user_id']
+
+    started_at = time.perf_counter()
+    sockets = []
+    for start in range(0, connections, 200):
+        batch = min(200, connections - start)
+        sockets += await asyncio.gather(*[open_socket(url, token) for _ in range(batch)])
+    print(f"🔌 {len(sockets)} sockets abertos em {time.perf_counter() - started_at:.1f}s")
+
+    sender = sockets[0]
+    sent_at = {}
+    arrivals = [{} for _ in sockets]
+    for i in range(messages):
+        send_started_at = time.perf_counter()
+        await sender.send(json.dumps({
+            'type': 'message', 'client_id': str(i),
+            'data': {'to_user_id': user_id, 'message': f"load test {i}"}
+        }))
+        while True:
+            frame = json.loads(await sender.recv())
+            # O próprio socket que enviou também recebe message_received (às vezes antes do 'sent')
+            if frame['type'] == 'message_received':
+                arrivals[0][frame['data']['id']] = time.perf_counter()
+            if frame['type'] == 'sent':
+                sent_at[frame['data']['message']['id']] = send_started_at
+                break
+
+    message_ids = set(sent_at)
+    try:
+        await asyncio.wait_for(asyncio.gather(*[
+            wait_for_message(socket, message_ids, socket_arrivals)
+            for socket, socket_arrivals in zip(sockets, arrivals)
+        ]), timeout=60)
+    except asyncio.TimeoutError:
+        print("⚠️  Timeout: nem todos os sockets receberam todas as mensagens")
+
+    latencies = [
+        (arrived - sent_at[message_id]) * 1000
+        for socket_arrivals in arrivals for message_id, arrived in socket_arrivals.items()
+    ]
+    expected = len(sockets) * len(message_ids)
+    print(f"📨 {len(latencies)}/{expected} entregas")
+    if latencies:
+        latencies.sort()
+        print(f"⏱️  p50 {statistics.median(latencies):.1f} ms | "
+              f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:.1f} ms | max {latencies[-1]:.1f} ms")
+
+    await asyncio.gather(*[socket.close() for socket in sockets])
+    return 0 if len(latencies) == expected else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do /api/ws")
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--token', required=True)
+    parser.add_argument('--connections', type=int, default=2000)
+    parser.add_argument('--messages', type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.url, args.token, args.connections, args.messages)))
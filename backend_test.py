@@ -265,10 +265,10 @@ class WatizatAPITester:
             200
         )
         
-        if success and isinstance(response, list):
-            # Check if posts have categories field
+        if success and isinstance(response, dict):
+            # Feed paginado: {'posts': [...], 'next_cursor': ...}
             posts_with_categories = 0
-            for post in response:
+            for post in response['posts']:
                 if 'categories' in post and isinstance(post['categories'], list):
                     posts_with_categories += 1
             
@@ -300,10 +300,10 @@ class WatizatAPITester:
             200
         )
         
-        if success and isinstance(response, list):
+        if success and isinstance(response, dict):
             # Check if the created post appears in housing category filter
             found_post = False
-            for post in response:
+            for post in response['posts']:
                 if post.get('id') == post_id:
                     found_post = True
                     break
@@ -322,10 +322,10 @@ class WatizatAPITester:
             200
         )
         
-        if success and isinstance(response, list):
+        if success and isinstance(response, dict):
             # Check if the created post appears in work category filter
             found_post = False
-            for post in response:
+            for post in response['posts']:
                 if post.get('id') == post_id:
                     found_post = True
                     break
@@ -457,10 +457,10 @@ class WatizatAPITester:
         # Restore original token
         self.token = original_token
         
-        if success and isinstance(posts_response, list):
+        if success and isinstance(posts_response, dict):
             # Check if volunteer can see the post
             found_matching_post = False
-            for post in posts_response:
+            for post in posts_response['posts']:
                 if post.get('id') == post_id and post.get('can_help'):
                     found_matching_post = True
                     break
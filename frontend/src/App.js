@@ -34,6 +34,19 @@ const LoadingComponent = () => (
 
 export const AuthContext = React.createContext();
 
+// Renovar o access token um minuto antes de expirar
+const REFRESH_MARGIN_MS = 60 * 1000;
+
+// Instante (ms) em que o access token expira, lido do próprio JWT (claim exp); 0 se não for possível ler
+const tokenExpiresAt = (jwt) => {
+  try {
+    const payload = JSON.parse(atob(jwt.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')));
+    return payload.exp ? payload.exp * 1000 : 0;
+  } catch (error) {
+    return 0;
+  }
+};
+
 function App() {
   const [user, setUser] = useState(null);
   const [token, setToken] = useState(localStorage.getItem('token'));
@@ -48,6 +61,42 @@ function App() {
     }
   }, [token]);
 
+  // Access token é de curta duração: renovar antes de expirar, contando a idade real do token
+  // (após recarregar a página ou voltar a uma aba suspensa ele pode já estar perto do fim ou vencido)
+  useEffect(() => {
+    if (!token || !localStorage.getItem('refresh_token')) return undefined;
+    const msUntilRefresh = () => tokenExpiresAt(token) - REFRESH_MARGIN_MS - Date.now();
+    const timer = setTimeout(refreshSession, Math.max(0, msUntilRefresh()));
+    const onVisibilityChange = () => {
+      if (document.visibilityState === 'visible' && msUntilRefresh() <= 0) refreshSession();
+    };
+    document.addEventListener('visibilitychange', onVisibilityChange);
+    return () => {
+      clearTimeout(timer);
+      document.removeEventListener('visibilitychange', onVisibilityChange);
+    };
+  }, [token]);
+
+  const refreshSession = async () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) return false;
+    try {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/auth/refresh`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken })
+      });
+      if (!response.ok) return false;
+      const data = await response.json();
+      localStorage.setItem('token', data.token);
+      setToken(data.token);
+      return true;
+    } catch (error) {
+      console.error('Error refreshing session:', error);
+      return false;
+    }
+  };
+
   const fetchUser = async () => {
     try {
       const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/profile`, {
@@ -58,7 +107,7 @@ function App() {
       if (response.ok) {
         const data = await response.json();
         setUser(data);
-      } else {
+      } else if (!(response.status === 401 && await refreshSession())) {
         logout();
       }
     } catch (error) {
@@ -68,14 +117,20 @@ function App() {
     }
   };
 
-  const login = (newToken, userData) => {
+  const login = (newToken, userData, refreshToken) => {
     localStorage.setItem('token', newToken);
+    if (refreshToken) {
+      localStorage.setItem('refresh_token', refreshToken);
+    }
     setToken(newToken);
     setUser(userData);
   };
 
   const logout = () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
+    // Chave gravada por versões anteriores
+    localStorage.removeItem('token_expires_in');
     setToken(null);
     setUser(null);
   };
@@ -85,7 +140,7 @@ function App() {
   }
 
   return (
-    <AuthContext.Provider value={{ user, token, login, logout }}>
+    <AuthContext.Provider value={{ user, token, login, logout, refreshSession }}>
       <BrowserRouter>
         <Suspense fallback={<LoadingComponent />}>
           <Routes>
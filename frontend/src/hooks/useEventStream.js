@@ -0,0 +1,42 @@
+import { useEffect, useRef, useState } from 'react';
+
+// Eventos em tempo real do backend (/api/stream, Server-Sent Events).
+// handlers: { post_created: fn, message_received: fn, comment_added: fn, resync: fn }
+// Retorna true enquanto a conexão está aberta (para desligar o polling de reserva).
+export default function useEventStream(token, handlers) {
+  const handlersRef = useRef(handlers);
+  const [connected, setConnected] = useState(false);
+
+  useEffect(() => {
+    handlersRef.current = handlers;
+  });
+
+  useEffect(() => {
+    if (!token || typeof EventSource === 'undefined') return undefined;
+
+    // O servidor encerra a conexão quando o token expira; com o token renovado, reconecta aqui
+    const source = new EventSource(
+      `${process.env.REACT_APP_BACKEND_URL}/api/stream?token=${encodeURIComponent(token)}`
+    );
+    const eventTypes = ['post_created', 'message_received', 'comment_added', 'resync'];
+    const listeners = eventTypes.map((type) => {
+      const listener = (event) => {
+        const handler = handlersRef.current[type];
+        if (handler) handler(JSON.parse(event.data));
+      };
+      source.addEventListener(type, listener);
+      return [type, listener];
+    });
+
+    source.onopen = () => setConnected(true);
+    source.onerror = () => setConnected(false);
+
+    return () => {
+      listeners.forEach(([type, listener]) => source.removeEventListener(type, listener));
+      source.close();
+      setConnected(false);
+    };
+  }, [token]);
+
+  return connected;
+}
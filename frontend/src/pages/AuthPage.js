@@ -208,7 +208,7 @@ export default function AuthPage() {
       const data = await response.json();
 
       if (response.ok) {
-        login(data.token, data.user);
+        login(data.token, data.user, data.refresh_token);
         toast.success(isLogin ? 'Login bem-sucedido!' : 'Conta criada com sucesso!');
         navigate('/home');
       } else {
@@ -6,6 +6,7 @@ import { Textarea } from '../components/ui/textarea';
 import { ArrowLeft, Send, User, MapPin, Image as ImageIcon, Video, Paperclip, Lock, Phone, MessageCircle, Clock, CheckCheck, Check, MoreVertical, Info, ExternalLink } from 'lucide-react';
 import { toast } from 'sonner';
 import MapPreview from '../components/MapPreview';
+import useEventStream from '../hooks/useEventStream';
 
 const CATEGORY_INFO = {
   food: { icon: '🍽️', label: 'Alimentação', color: 'bg-green-100 text-green-700' },
@@ -37,19 +38,58 @@ export default function DirectChatPage() {
   const videoInputRef = useRef(null);
   const [userPosts, setUserPosts] = useState([]);
   const [showUserInfo, setShowUserInfo] = useState(false);
+  // Paginação do histórico: before_cursor para rolar para trás, after_cursor para buscar só as novas
+  const [beforeCursor, setBeforeCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
+  const afterCursorRef = useRef(null);
 
   useEffect(() => {
     fetchOtherUser();
     checkCanChat();
+    afterCursorRef.current = null;
     fetchMessages();
     fetchUserPosts();
-    const interval = setInterval(fetchMessages, 3000);
-    return () => clearInterval(interval);
   }, [userId]);
 
+  // Novas mensagens chegam pelo /api/stream; sem stream, volta ao polling
+  const streamConnected = useEventStream(token, {
+    message_received: (msg) => {
+      if (msg.from_user_id === userId || msg.to_user_id === userId) {
+        setMessages((prev) => (prev.some((m) => m.id === msg.id) ? prev : [...prev, msg]));
+      }
+    },
+    resync: () => fetchMessages()
+  });
+
+  useEffect(() => {
+    if (streamConnected) {
+      // Pode ter chegado mensagem enquanto a conexão estava fechada
+      fetchNewMessages();
+      return undefined;
+    }
+    const interval = setInterval(fetchNewMessages, 3000);
+    return () => clearInterval(interval);
+  }, [userId, streamConnected]);
+
+  // Rola para o fim só quando chega mensagem nova (não ao carregar as anteriores)
+  const lastMessageId = messages.length > 0 ? messages[messages.length - 1].id : null;
   useEffect(() => {
     scrollToBottom();
-  }, [messages]);
+  }, [lastMessageId]);
+
+  // Conversa aberta = lida até a última mensagem exibida (o servidor agrupa as marcações)
+  useEffect(() => {
+    const lastMessage = messages[messages.length - 1];
+    if (!lastMessage || lastMessage.from_user_id !== userId) return;
+    fetch(`${process.env.REACT_APP_BACKEND_URL}/api/messages/${userId}/read`, {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({ read_until: lastMessage.created_at })
+    }).catch((error) => console.error('Error marking messages as read:', error));
+  }, [lastMessageId]);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -77,7 +117,7 @@ export default function DirectChatPage() {
       if (response.ok) {
         const data = await response.json();
         // Filtrar posts do usuário com quem estamos conversando
-        const posts = data.filter(p => p.user_id === userId);
+        const posts = data.posts.filter(p => p.user_id === userId);
         setUserPosts(posts);
       }
     } catch (error) {
@@ -102,14 +142,28 @@ export default function DirectChatPage() {
     }
   };
 
+  const requestMessages = async (params = '') => {
+    const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/messages/${userId}${params}`, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    });
+    return response.ok ? response.json() : null;
+  };
+
+  const appendMessages = (newMessages) => {
+    setMessages((prev) => {
+      const known = new Set(prev.map((m) => m.id));
+      return [...prev, ...newMessages.filter((m) => !known.has(m.id))];
+    });
+  };
+
+  // Página mais recente (abertura da conversa ou resync)
   const fetchMessages = async () => {
     try {
-      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/messages/${userId}`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      if (response.ok) {
-        const data = await response.json();
-        setMessages(data);
+      const data = await requestMessages();
+      if (data) {
+        setMessages(data.messages);
+        setBeforeCursor(data.before_cursor);
+        afterCursorRef.current = data.after_cursor;
       }
     } catch (error) {
       console.error('Error fetching messages:', error);
@@ -118,6 +172,41 @@ export default function DirectChatPage() {
     }
   };
 
+  // Só o que chegou depois da última mensagem conhecida
+  const fetchNewMessages = async () => {
+    if (!afterCursorRef.current) {
+      fetchMessages();
+      return;
+    }
+    try {
+      let data;
+      do {
+        data = await requestMessages(`?after=${encodeURIComponent(afterCursorRef.current)}`);
+        if (!data) return;
+        appendMessages(data.messages);
+        afterCursorRef.current = data.after_cursor;
+      } while (data.has_more_after);
+    } catch (error) {
+      console.error('Error fetching messages:', error);
+    }
+  };
+
+  const loadOlderMessages = async () => {
+    if (!beforeCursor) return;
+    setLoadingOlder(true);
+    try {
+      const data = await requestMessages(`?before=${encodeURIComponent(beforeCursor)}`);
+      if (data) {
+        setMessages((prev) => [...data.messages, ...prev]);
+        setBeforeCursor(data.before_cursor);
+      }
+    } catch (error) {
+      console.error('Error fetching older messages:', error);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const sendMessage = async (messageData = {}) => {
     if (!input.trim() && !messageData.location && !messageData.media) return;
 
@@ -141,7 +230,7 @@ export default function DirectChatPage() {
       if (response.ok) {
         setInput('');
         setShowMediaOptions(false);
-        fetchMessages();
+        fetchNewMessages();
       } else {
         toast.error('Erro ao enviar mensagem');
       }
@@ -390,6 +479,21 @@ export default function DirectChatPage() {
             </div>
           ) : (
             <>
+              {beforeCursor && (
+                <div className="text-center mb-4">
+                  <Button
+                    onClick={loadOlderMessages}
+                    disabled={loadingOlder}
+                    variant="outline"
+                    size="sm"
+                    className="rounded-full"
+                    data-testid="load-older-messages-button"
+                  >
+                    {loadingOlder ? 'Carregando...' : 'Carregar mensagens anteriores'}
+                  </Button>
+                </div>
+              )}
+
               {/* Mostrar solicitação original no topo se for conversa sobre ajuda */}
               {userPosts.length > 0 && userPosts[0].type === 'need' && messages.length < 5 && (
                 <div className="bg-gradient-to-r from-green-50 to-emerald-50 border-2 border-green-200 rounded-2xl p-4 mb-4">
@@ -11,6 +11,7 @@ import { Plus, MapPin, User, Clock, MessageCircle, Image as ImageIcon, MessageSq
 import { toast } from 'sonner';
 import { useTranslation } from 'react-i18next';
 import { useNavigate } from 'react-router-dom';
+import useEventStream from '../hooks/useEventStream';
 
 const RESOURCES_INFO = {
   work: {
@@ -148,6 +149,7 @@ export default function HomePage() {
   });
   const [showComments, setShowComments] = useState({});
   const [comments, setComments] = useState({});
+  const [commentCursors, setCommentCursors] = useState({});
   const [newComment, setNewComment] = useState('');
   const [commentingOn, setCommentingOn] = useState(null);
   const [advertisements, setAdvertisements] = useState([]);
@@ -175,6 +177,16 @@ export default function HomePage() {
     filterPosts();
   }, [posts, categoryFilter, typeFilter]);
 
+  // Feed atualizado por push: o evento já traz o post formatado, que entra no topo da lista
+  // (sem cada cliente conectado refazer GET /api/posts a cada publicação)
+  useEventStream(token, {
+    post_created: (post) => {
+      if (post.is_auto_response) return;
+      setPosts((current) => (current.some((p) => p.id === post.id) ? current : [post, ...current]));
+    },
+    resync: () => fetchPosts()
+  });
+
   // Buscar vagas personalizadas do usuário
   const fetchPersonalizedJobs = async () => {
     try {
@@ -397,7 +409,7 @@ export default function HomePage() {
       });
       if (response.ok) {
         const data = await response.json();
-        setPosts(data.filter(p => !p.is_auto_response));
+        setPosts(data.posts.filter(p => !p.is_auto_response));
       }
     } catch (error) {
       console.error('Error fetching posts:', error);
@@ -529,14 +541,17 @@ export default function HomePage() {
     }
   };
 
-  const fetchComments = async (postId) => {
+  // Sem cursor carrega a primeira página; com cursor acrescenta a próxima
+  const fetchComments = async (postId, cursor = null) => {
     try {
-      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/posts/${postId}/comments`, {
+      const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/posts/${postId}/comments${params}`, {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       if (response.ok) {
         const data = await response.json();
-        setComments(prev => ({...prev, [postId]: data}));
+        setComments(prev => ({...prev, [postId]: cursor ? [...(prev[postId] || []), ...data.comments] : data.comments}));
+        setCommentCursors(prev => ({...prev, [postId]: data.next_cursor}));
       }
     } catch (error) {
       console.error('Error fetching comments:', error);
@@ -1521,7 +1536,10 @@ export default function HomePage() {
                         className="rounded-full text-xs sm:text-sm px-3 py-2 w-full sm:w-auto"
                       >
                         <MessageSquare size={14} className="sm:mr-1" />
-                        <span className="ml-1">{showComments[post.id] ? t('hideMap') : t('commentsBtn')}</span>
+                        <span className="ml-1">
+                          {showComments[post.id] ? t('hideMap') : t('commentsBtn')}
+                          {post.comment_count > 0 && ` (${post.comment_count})`}
+                        </span>
                       </Button>
                       {post.user_id !== user.id && post.can_help && (
                         <Button
@@ -1537,6 +1555,17 @@ export default function HomePage() {
                   )}
                 </div>
 
+                {/* Prévia: comentários mais recentes que já vêm no feed */}
+                {!showComments[post.id] && post.latest_comments?.length > 0 && (
+                  <div className="mt-3 space-y-1">
+                    {post.latest_comments.map((comment) => (
+                      <p key={comment.id} className="text-sm text-textSecondary truncate">
+                        <span className="font-medium text-textPrimary">{comment.user?.name}</span> {comment.comment}
+                      </p>
+                    ))}
+                  </div>
+                )}
+
                 {showComments[post.id] && (
                   <div className="mt-4 pt-4 border-t space-y-3">
                     {comments[post.id] && comments[post.id].length > 0 ? (
@@ -1558,6 +1587,16 @@ export default function HomePage() {
                       <p className="text-sm text-textMuted text-center py-2">{t('noMessagesYet')}</p>
                     )}
 
+                    {commentCursors[post.id] && (
+                      <button
+                        onClick={() => fetchComments(post.id, commentCursors[post.id])}
+                        className="text-sm text-primary hover:underline w-full text-center"
+                        data-testid="load-more-comments-button"
+                      >
+                        Ver mais comentários
+                      </button>
+                    )}
+
                     <div className="flex gap-2 mt-3">
                       <Input
                         placeholder={t('askQuestion')}
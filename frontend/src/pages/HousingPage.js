@@ -155,6 +155,22 @@ export default function HousingPage() {
     }
   };
 
+  // Verificação e avaliações do anfitrião não vêm na lista (cacheada por ETag): o detalhe é buscado ao abrir
+  const openListing = async (listing) => {
+    setSelectedListing(listing);
+    try {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/housing/${listing.id}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (response.ok) {
+        const detail = await response.json();
+        setSelectedListing((current) => (current && current.id === detail.id ? detail : current));
+      }
+    } catch (error) {
+      console.error('Error fetching housing listing:', error);
+    }
+  };
+
   const createListing = async () => {
     if (!newListing.title || !newListing.city) {
       toast.error(t('fillRequiredFields'));
@@ -392,7 +408,7 @@ export default function HousingPage() {
               <div
                 key={listing.id}
                 className="group cursor-pointer"
-                onClick={() => setSelectedListing(listing)}
+                onClick={() => openListing(listing)}
               >
                 {/* Image Container */}
                 <div className="relative aspect-square rounded-xl overflow-hidden mb-3">
@@ -507,7 +523,7 @@ export default function HousingPage() {
               {/* Image */}
               <div className="relative h-64 sm:h-80">
                 <img
-                  src={selectedListing.photos?.[0] || getRandomImage(listings.indexOf(selectedListing))}
+                  src={selectedListing.photos?.[0] || getRandomImage(listings.findIndex(l => l.id === selectedListing.id))}
                   alt={selectedListing.title}
                   className="w-full h-full object-cover"
                 />
@@ -210,7 +210,7 @@ export default function JobsPage() {
       if (response.ok) {
         const data = await response.json();
         // Filtrar posts de trabalho
-        const workPosts = data.filter(p => p.category === 'work');
+        const workPosts = data.posts.filter(p => p.category === 'work');
         
         // Separar ofertas e procuras
         const offers = workPosts.filter(p => p.type === 'offer');
@@ -24,7 +24,7 @@ const HELP_CATEGORIES = [
 ];
 
 export default function ProfilePage() {
-  const { user, logout, token, login } = useContext(AuthContext);
+  const { user, logout, token, login, refreshSession } = useContext(AuthContext);
   const navigate = useNavigate();
   const { t } = useTranslation();
   const [showEditDialog, setShowEditDialog] = useState(false);
@@ -107,6 +107,8 @@ export default function ProfilePage() {
       if (response.ok) {
         toast.success('Categorias atualizadas!');
         setShowCategoriesDialog(false);
+        // As categorias vão no access token: renovar para o feed refletir a mudança
+        refreshSession();
       } else {
         toast.error('Erro ao salvar categorias');
       }
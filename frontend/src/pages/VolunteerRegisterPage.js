@@ -154,7 +154,7 @@ export default function VolunteerRegisterPage() {
       const data = await response.json();
 
       if (response.ok) {
-        login(data.token, data.user);
+        login(data.token, data.user, data.refresh_token);
         toast.success(t('registerSuccess'));
         navigate('/volunteers');
       } else {
@@ -83,7 +83,7 @@ export default function VolunteersPage() {
       });
       if (response.ok) {
         const data = await response.json();
-        const filtered = data.filter(post => {
+        const filtered = data.posts.filter(post => {
           const postCategories = post.categories || [post.category];
           return postCategories.some(cat => selectedCategories.includes(cat));
         });
@@ -0,0 +1,118 @@
+import os
+import sys
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+
+# Os módulos do backend são importados pelo nome (ex: from user_cache import UserCache)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    def sort(self, *args):
+        return self
+
+    async def to_list(self, length=None):
+        return self._docs[:length]
+
+
+class FakeCollection:
+    """Coleção em memória com o mínimo usado pelos testes sem MongoDB (documentos por _id)"""
+
+    def __init__(self):
+        self.docs = {}
+        self.bulk_writes = []
+        self.fail = False
+
+    def find(self, query=None, projection=None):
+        """Só filtros de igualdade em campos de primeiro nível"""
+        query = query or {}
+        return FakeCursor([
+            dict(doc) for doc in self.docs.values()
+            if all(doc.get(field) == value for field, value in query.items())
+        ])
+
+    async def find_one(self, query):
+        return self.docs.get(query['_id'])
+
+    async def update_one(self, query, update, upsert=False):
+        if upsert and query['_id'] not in self.docs:
+            self.docs[query['_id']] = {**query, **update.get('$setOnInsert', {})}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        doc = self.docs.get(query['_id'])
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self.docs[query['_id']] = dict(query)
+        for field, value in update.get('$inc', {}).items():
+            doc[field] = doc.get(field, 0) + value
+        return dict(doc)
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            raise RuntimeError('mongo indisponível')
+        self.bulk_writes.append(operations)
+
+
+class FakeDb:
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self._collections.setdefault(name, FakeCollection())
+
+
+@pytest.fixture
+def fake_db():
+    return FakeDb()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """backend/server.py importado sem MongoDB (o cliente Motor só conecta na primeira consulta)"""
+    if 'server' not in sys.modules:
+        monkeypatch.setenv('MONGO_URL', os.environ.get('MONGO_URL') or 'mongodb://localhost:27017')
+    import server
+    return server
+
+
+@pytest.fixture
+def mongo_database():
+    """
+    Fábrica de bancos temporários em MONGO_URL, apagados ao final (pula o teste sem MONGO_URL).
+    Uso: async with mongo_database('prefixo') as db: ...
+    """
+    if not os.environ.get('MONGO_URL'):
+        pytest.skip('MONGO_URL não definido')
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    @asynccontextmanager
+    async def database(prefix: str = 'test'):
+        # O cliente é criado dentro do event loop do teste (asyncio.run)
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[f"{prefix}_{uuid.uuid4().hex[:8]}"]
+        try:
+            yield db
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    return database
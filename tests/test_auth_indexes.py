@@ -0,0 +1,18 @@
+import asyncio
+
+from check_indexes import FORBIDDEN_STAGES, explain_query
+from db_indexes import HOT_QUERIES, ensure_indexes
+
+AUTH_QUERIES = [query for query in HOT_QUERIES if query['name'].startswith('auth:')]
+
+
+def test_auth_queries_use_indexes(mongo_database):
+    async def explain_all():
+        async with mongo_database('test_auth_indexes') as db:
+            await ensure_indexes(db)
+            return {query['name']: await explain_query(db, query) for query in AUTH_QUERIES}
+
+    plans = asyncio.run(explain_all())
+    assert AUTH_QUERIES
+    for name, stages in plans.items():
+        assert not stages & FORBIDDEN_STAGES, f"{name}: {sorted(stages)}"
@@ -0,0 +1,32 @@
+from auto_responses import AUTO_RESPONSES, AutoResponseCatalog
+
+RESPONSES = {'food': {'title': 'Comida', 'content': 'Restos du Coeur'}}
+
+
+def test_reference_and_render_round_trip():
+    catalog = AutoResponseCatalog(RESPONSES, version=3, language='pt')
+    reference = catalog.reference('food')
+    assert reference == {'template_id': 'food', 'template_version': 3, 'language': 'pt'}
+
+    message = catalog.render({'id': 'm1', **reference})
+    assert message['message'] == 'Comida\n\nRestos du Coeur'
+
+
+def test_unknown_category_has_no_reference():
+    assert AutoResponseCatalog(RESPONSES).reference('legal') is None
+
+
+def test_unknown_language_falls_back_to_default():
+    catalog = AutoResponseCatalog(RESPONSES, language='pt')
+    assert catalog.text('food', 'fr') == 'Comida\n\nRestos du Coeur'
+
+
+def test_render_keeps_stored_text():
+    catalog = AutoResponseCatalog(RESPONSES)
+    message = {'template_id': 'food', 'message': 'texto antigo'}
+    assert catalog.render(message)['message'] == 'texto antigo'
+
+
+def test_default_catalog_covers_every_category():
+    catalog = AutoResponseCatalog()
+    assert all(catalog.reference(category) for category in AUTO_RESPONSES)
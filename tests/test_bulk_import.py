@@ -0,0 +1,52 @@
+import pytest
+
+from bulk_import import build_user_doc, parse_rows, validate_row
+
+VALID_ROW = {'email': 'ana@example.com', 'password': 'segredo1', 'name': 'Ana', 'role': 'migrant'}
+
+
+def test_valid_row():
+    assert validate_row(dict(VALID_ROW)) == ''
+
+
+@pytest.mark.parametrize('line', ['[1, 2]', '5', '"texto"', 'null'])
+def test_non_object_ndjson_rows_are_invalid(line):
+    [row] = parse_rows(line, 'ndjson')
+    assert validate_row(row) == 'invalid_row'
+
+
+@pytest.mark.parametrize('field, value', [
+    ('email', 5), ('password', 123456), ('name', ['Ana']), ('role', 1),
+    ('phone', 612345678), ('languages', 'pt'), ('languages', ['pt', 1]),
+])
+def test_wrong_field_types_are_rejected(field, value):
+    row = {**VALID_ROW, field: value}
+    assert validate_row(row) == 'invalid_field_type'
+
+
+def test_invalid_json_line():
+    [row] = parse_rows('{"email":', 'ndjson')
+    assert validate_row(row) == 'invalid_json'
+
+
+def test_csv_list_fields_are_split():
+    text = 'email,password,name,role,languages\nana@example.com,segredo1,Ana,migrant,pt; fr\n'
+    [row] = parse_rows(text, 'csv')
+    assert row['languages'] == ['pt', 'fr']
+    assert validate_row(row) == ''
+
+
+@pytest.mark.parametrize('email', ['foo@bar..com', 'sem-arroba', 'ana@', '@example.com'])
+def test_invalid_emails_are_rejected(email):
+    assert validate_row({**VALID_ROW, 'email': email}) == 'invalid_email'
+
+
+def test_email_is_stored_like_email_str():
+    from pydantic import BaseModel, EmailStr
+
+    class Login(BaseModel):
+        email: EmailStr
+
+    row = {**VALID_ROW, 'email': ' Ana@Example.COM '}
+    assert validate_row(row) == ''
+    assert build_user_doc(row, 'hash')['email'] == Login(email='Ana@Example.COM').email == 'Ana@example.com'
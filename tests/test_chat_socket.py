@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def socket_url(server):
+    token = server.create_access_token({'id': 'u1', 'email': 'u1@example.com', 'role': 'migrant'})
+    return f'/api/ws?token={token}'
+
+
+@pytest.mark.parametrize('frame', [
+    {'type': 'message', 'client_id': 'c1', 'data': 'oi'},
+    {'type': 'message', 'client_id': 'c1', 'data': [1, 2]},
+    {'type': 'message', 'client_id': 'c1', 'data': {'to_user_id': 'u2'}},
+])
+def test_malformed_message_gets_error_frame_and_socket_stays_open(server, socket_url, frame):
+    with TestClient(server.app).websocket_connect(socket_url) as socket:
+        socket.send_json(frame)
+        assert socket.receive_json() == {'type': 'error', 'data': {'client_id': 'c1', 'detail': 'Invalid message'}}
+        socket.send_json({'type': 'ping'})
+        assert socket.receive_json() == {'type': 'pong', 'data': {}}
+
+
+@pytest.mark.parametrize('frame', [
+    {'type': 'read', 'partner_id': {'id': 'u2'}, 'read_until': '2024-01-01T10:00:00+00:00'},
+    {'type': 'typing', 'to_user_id': ['u2']},
+    {'type': 'delivered', 'to_user_id': 'u2', 'message_id': 5},
+    {'type': 'desconhecido'},
+])
+def test_frames_with_invalid_ids_are_rejected(server, socket_url, frame):
+    with TestClient(server.app).websocket_connect(socket_url) as socket:
+        socket.send_json(frame)
+        assert socket.receive_json()['type'] == 'error'
+        socket.send_json({'type': 'ping'})
+        assert socket.receive_json()['type'] == 'pong'
+    assert server.read_receipts.stats()['pending'] == 0
+
+
+def test_invalid_token_is_closed_with_4401(server):
+    from starlette.websockets import WebSocketDisconnect
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with TestClient(server.app).websocket_connect('/api/ws?token=inválido') as socket:
+            socket.receive_json()
+    assert closed.value.code == 4401
@@ -0,0 +1,60 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from collection_versions import CollectionVersions
+
+
+def test_etag_changes_only_when_a_listed_collection_is_bumped(fake_db):
+    versions = CollectionVersions()
+    posts_etag = versions.etag(['posts'], [('type', 'need')])
+    assert versions.etag(['posts'], [('type', 'need')]) == posts_etag
+    assert versions.etag(['posts'], [('type', 'offer')]) != posts_etag
+
+    asyncio.run(versions.bump(fake_db, 'housing_listings'))
+    assert versions.etag(['posts'], [('type', 'need')]) == posts_etag
+
+    asyncio.run(versions.bump(fake_db, 'posts'))
+    assert versions.get('posts') == 1
+    assert versions.etag(['posts'], [('type', 'need')]) != posts_etag
+
+
+def test_load_never_moves_a_version_backwards(fake_db):
+    versions = CollectionVersions()
+    asyncio.run(versions.bump(fake_db, 'posts'))
+    asyncio.run(versions.bump(fake_db, 'posts'))
+    fake_db.collection_versions.docs['posts']['version'] = 1
+
+    asyncio.run(versions.load(fake_db))
+    assert versions.get('posts') == 2
+
+
+def test_if_none_match():
+    assert CollectionVersions.matches('W/"a", W/"b"', 'W/"b"')
+    assert CollectionVersions.matches('*', 'W/"b"')
+    assert not CollectionVersions.matches(None, 'W/"b"')
+    assert not CollectionVersions.matches('W/"a"', 'W/"b"')
+
+
+def test_matching_etag_returns_304_without_querying(server):
+    # db.advertisements não está disponível: só a resposta 304 pode ser servida
+    etag = server.collection_versions.etag(['advertisements'], [('type', 'banner')])
+    client = TestClient(server.app)
+
+    response = client.get('/api/advertisements?type=banner', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+
+
+def test_housing_list_only_carries_fields_covered_by_its_etag(server, fake_db, monkeypatch):
+    # verified/rating/reviews_count não bumpam housing_listings: ficam fora da lista cacheável
+    monkeypatch.setattr(server, 'db', fake_db)
+    monkeypatch.setattr(server, 'conditional_etag', lambda *args: None)
+    fake_db.housing_listings.docs['l1'] = {
+        'id': 'l1', 'user_id': 'u1', 'listing_status': 'active',
+        'author': {'name': 'Ana', 'verified': True, 'rating': 4.5, 'reviews_count': 3}
+    }
+
+    listings = asyncio.run(server.get_housing_listings(None, None, None, None, None))
+    assert listings == [{'id': 'l1', 'user_id': 'u1', 'listing_status': 'active', 'user': {'id': 'u1', 'name': 'Ana'}}]
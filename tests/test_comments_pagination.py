@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+
+def test_invalid_cursor_is_rejected(server):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.get_comments('p1', cursor='inválido', limit=10))
+    assert error.value.status_code == 400
+
+
+def test_pages_cover_every_comment_once(server, mongo_database, monkeypatch):
+    # Horários repetidos: o desempate por id não pode pular nem repetir comentários
+    comments = [
+        {'id': f'c{i}', 'post_id': 'p1', 'user_id': 'u1', 'comment': str(i),
+         'created_at': f'2024-01-01T10:00:0{i // 2}+00:00', 'author': {'name': 'Ana', 'role': 'migrant'}}
+        for i in range(7)
+    ]
+
+    async def walk():
+        async with mongo_database('test_comments_pagination') as db:
+            monkeypatch.setattr(server, 'db', db)
+            await db.comments.insert_many([dict(comment) for comment in comments])
+            await db.comments.insert_one({**comments[0], 'id': 'outro', 'post_id': 'p2'})
+            pages, cursor = [], None
+            while True:
+                page = await server.get_comments('p1', cursor=cursor, limit=3)
+                pages.append([comment['id'] for comment in page['comments']])
+                cursor = page['next_cursor']
+                if not cursor:
+                    return pages
+
+    pages = asyncio.run(walk())
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == [comment['id'] for comment in comments]
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from conversations import PREVIEW_LENGTH, message_preview, record_messages
+
+
+def test_message_preview_keeps_reference_fields_and_truncates_text():
+    preview = message_preview({
+        'id': 'm1', 'from_user_id': 'a', 'to_user_id': 'b', 'message': 'x' * (PREVIEW_LENGTH + 50),
+        'created_at': '2024-01-01T10:00:00+00:00', 'template_id': None
+    })
+    assert preview == {'id': 'm1', 'from_user_id': 'a', 'created_at': '2024-01-01T10:00:00+00:00',
+                       'message': 'x' * PREVIEW_LENGTH}
+
+
+def test_invalid_cursor_is_rejected(server):
+    user = server.User(id='a', email='a@example.com', name='Ana', role='migrant')
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.get_conversations(cursor='inválido', limit=10, current_user=user))
+    assert error.value.status_code == 400
+
+
+def test_inbox_is_paged_from_the_most_recent_conversation(server, mongo_database, monkeypatch):
+    user = server.User(id='a', email='a@example.com', name='Ana', role='migrant')
+    partners = ['b', 'c', 'd', 'e', 'f']
+
+    def message(sender, recipient, minute):
+        return {'id': f'{sender}{recipient}{minute}', 'from_user_id': sender, 'to_user_id': recipient,
+                'message': f'{minute}', 'created_at': f'2024-01-01T10:{minute:02d}:00+00:00'}
+
+    async def walk():
+        async with mongo_database('test_conversations') as db:
+            monkeypatch.setattr(server, 'db', db)
+            await db.users.insert_many([
+                {'id': partner, 'email': f'{partner}@example.com', 'name': partner, 'role': 'volunteer'}
+                for partner in partners
+            ])
+            # Mensagens gravadas fora de ordem: a prévia fica com a mais recente de cada conversa
+            await record_messages(db, [message(partner, 'a', i) for i, partner in enumerate(partners)])
+            await record_messages(db, [message('a', 'b', 30), message('b', 'a', 1)])
+
+            pages, cursor = [], None
+            while True:
+                page = await server.get_conversations(cursor=cursor, limit=2, current_user=user)
+                pages.append([(conv['user']['id'], conv['last_message'], conv['unread_count'])
+                              for conv in page['conversations']])
+                cursor = page['next_cursor']
+                if not cursor:
+                    return pages
+
+    pages = asyncio.run(walk())
+    assert sum(pages, []) == [('b', '30', 2), ('f', '4', 1), ('e', '3', 1), ('d', '2', 1), ('c', '1', 1)]
@@ -0,0 +1,18 @@
+import asyncio
+
+import pytest
+
+from check_indexes import FORBIDDEN_STAGES, explain_query
+from db_indexes import HOT_QUERIES, ensure_indexes
+
+
+@pytest.mark.parametrize('query', HOT_QUERIES, ids=[query['name'] for query in HOT_QUERIES])
+def test_hot_query_uses_index(mongo_database, query):
+    """Mesma verificação de check_indexes.py: sem COLLSCAN nem ordenação em memória"""
+    async def explain():
+        async with mongo_database('test_hot_queries') as db:
+            await ensure_indexes(db)
+            return await explain_query(db, query)
+
+    stages = asyncio.run(explain())
+    assert not stages & FORBIDDEN_STAGES, sorted(stages)
@@ -0,0 +1,26 @@
+import asyncio
+
+from conversations import conversation_id
+
+
+def test_conversation_id_is_the_same_for_both_sides():
+    assert conversation_id('b', 'a') == conversation_id('a', 'b') == 'a:b'
+    assert conversation_id('system', 'u1') == 'system:u1'
+
+
+def test_backfill_skips_incomplete_messages_and_terminates(mongo_database, monkeypatch):
+    import migrations
+
+    monkeypatch.setenv('MIGRATION_BATCH_SIZE', '2')
+    messages = [{'id': str(i), 'from_user_id': 'b', 'to_user_id': 'a', 'created_at': str(i)} for i in range(5)]
+    incomplete = [{'id': 'x1', 'from_user_id': 'a'}, {'id': 'x2', 'to_user_id': 'a'}, {'id': 'x3'}]
+
+    async def backfill():
+        async with mongo_database('test_message_conversation_ids') as db:
+            await db.messages.insert_many(messages + incomplete)
+            await asyncio.wait_for(migrations.message_conversation_ids(db), timeout=30)
+            return {doc['id']: doc.get('conversation_id') async for doc in db.messages.find({})}
+
+    ids = asyncio.run(backfill())
+    assert all(ids[message['id']] == 'a:b' for message in messages)
+    assert all(ids[message['id']] is None for message in incomplete)
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from conversations import conversation_id
+from pagination import encode_cursor
+
+
+def current_user(server):
+    return server.User(id='a', email='a@example.com', name='Ana', role='migrant')
+
+
+@pytest.mark.parametrize('params, detail', [
+    ({'before': encode_cursor('t', 'm'), 'after': encode_cursor('t', 'm')}, 'Use either before or after, not both'),
+    ({'before': 'inválido'}, 'Invalid cursor'),
+    ({'after': encode_cursor('só-um')}, 'Invalid cursor'),
+])
+def test_invalid_cursors_are_rejected(server, params, detail):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.get_messages('b', limit=10, current_user=current_user(server), **params))
+    assert error.value.status_code == 400
+    assert error.value.detail == detail
+
+
+def test_scroll_back_and_fetch_newer_messages(server, mongo_database, monkeypatch):
+    monkeypatch.setattr(server, 'legacy_messages_pending', False)
+    user = current_user(server)
+
+    def message(i):
+        sender, recipient = ('a', 'b') if i % 2 else ('b', 'a')
+        # Pares de mensagens no mesmo instante: o desempate é pelo id
+        return {'id': f'm{i:02d}', 'conversation_id': conversation_id('a', 'b'), 'from_user_id': sender,
+                'to_user_id': recipient, 'message': str(i), 'created_at': f'2024-01-01T10:00:{i // 2:02d}+00:00'}
+
+    async def scenario():
+        async with mongo_database('test_message_history') as db:
+            monkeypatch.setattr(server, 'db', db)
+            await db.messages.insert_many([message(i) for i in range(7)])
+            await db.messages.insert_one({**message(0), 'id': 'outra', 'conversation_id': conversation_id('a', 'c')})
+
+            pages = []
+            page = await server.get_messages('b', limit=3, current_user=user)
+            after_cursor = page['after_cursor']
+            while True:
+                pages.insert(0, [msg['id'] for msg in page['messages']])
+                if not page['before_cursor']:
+                    break
+                page = await server.get_messages('b', before=page['before_cursor'], limit=3, current_user=user)
+
+            nothing_new = await server.get_messages('b', after=after_cursor, limit=3, current_user=user)
+            await db.messages.insert_many([message(i) for i in range(7, 12)])
+            newer = await server.get_messages('b', after=after_cursor, limit=3, current_user=user)
+            rest = await server.get_messages('b', after=newer['after_cursor'], limit=3, current_user=user)
+            return pages, nothing_new, newer, rest
+
+    pages, nothing_new, newer, rest = asyncio.run(scenario())
+    assert sum(pages, []) == [f'm{i:02d}' for i in range(7)]
+    assert nothing_new['messages'] == [] and not nothing_new['has_more_after']
+    assert [msg['id'] for msg in newer['messages']] == ['m07', 'm08', 'm09'] and newer['has_more_after']
+    assert [msg['id'] for msg in rest['messages']] == ['m10', 'm11'] and not rest['has_more_after']
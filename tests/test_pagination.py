@@ -0,0 +1,40 @@
+import pytest
+
+from pagination import and_filters, decode_cursor, encode_cursor, keyset_filter
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('2024-05-01T10:00:00+00:00', 'abc')
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 2) == ['2024-05-01T10:00:00+00:00', 'abc']
+
+
+@pytest.mark.parametrize('cursor', ['', 'não-é-base64', encode_cursor('só-um'), encode_cursor('a', 'b', 'c')])
+def test_invalid_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def test_non_list_cursor_is_rejected():
+    import base64
+    import json
+    cursor = base64.urlsafe_b64encode(json.dumps({'a': 1}).encode()).decode()
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 1)
+
+
+def test_keyset_filter_descending():
+    assert keyset_filter(['created_at', 'id'], ['c', 'i']) == {'$or': [
+        {'created_at': {'$lt': 'c'}},
+        {'created_at': 'c', 'id': {'$lt': 'i'}},
+    ]}
+
+
+def test_keyset_filter_ascending_single_field():
+    assert keyset_filter(['created_at'], ['c'], descending=False) == {'created_at': {'$gt': 'c'}}
+
+
+def test_and_filters_skips_empty():
+    assert and_filters(None, {}) == {}
+    assert and_filters({'a': 1}, None) == {'a': 1}
+    assert and_filters({'a': 1}, {'b': 2}) == {'$and': [{'a': 1}, {'b': 2}]}
@@ -0,0 +1,67 @@
+import asyncio
+
+import bcrypt
+import pytest
+
+from password_hashing import PasswordHasher, PasswordHasherSaturated, stored_rounds
+
+
+def test_needs_rehash_only_for_weaker_hashes():
+    hasher = PasswordHasher(rounds=5)
+    weaker = bcrypt.hashpw(b'senha', bcrypt.gensalt(rounds=4)).decode()
+    stronger = bcrypt.hashpw(b'senha', bcrypt.gensalt(rounds=6)).decode()
+
+    assert hasher.needs_rehash(weaker)
+    assert not hasher.needs_rehash(stronger)
+    hasher.shutdown()
+
+
+def test_workers_adopt_the_stored_calibration(fake_db):
+    fake_db.settings.docs['bcrypt_rounds:250'] = {'_id': 'bcrypt_rounds:250', 'rounds': 11}
+    hasher = PasswordHasher(rounds=12)
+
+    assert asyncio.run(hasher.load_or_calibrate(fake_db, 250)) == 11
+    assert hasher.rounds == 11
+    hasher.shutdown()
+
+
+def test_first_worker_stores_its_calibration(fake_db):
+    hasher = PasswordHasher()
+
+    rounds = asyncio.run(hasher.load_or_calibrate(fake_db, 1))
+    assert fake_db.settings.docs['bcrypt_rounds:1']['rounds'] == rounds == hasher.rounds
+    hasher.shutdown()
+
+
+def test_stored_rounds_reads_the_shared_calibration(fake_db):
+    assert asyncio.run(stored_rounds(fake_db, 250)) is None
+
+    fake_db.settings.docs['bcrypt_rounds:250'] = {'_id': 'bcrypt_rounds:250', 'rounds': 13}
+    assert asyncio.run(stored_rounds(fake_db, 250)) == 13
+
+
+def test_saturated_pool_rejects_new_work():
+    hasher = PasswordHasher(max_workers=1, max_queue=1, rounds=4)
+
+    async def hash_three():
+        return await asyncio.gather(*[hasher.hash('senha') for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(hash_three())
+    assert [isinstance(result, PasswordHasherSaturated) for result in results] == [False, False, True]
+    assert hasher.stats()['rejected'] == 1
+    assert hasher.stats()['in_flight'] == 0
+    hasher.shutdown()
+
+
+def test_saturation_is_answered_with_503(server, monkeypatch):
+    from fastapi import HTTPException
+
+    saturated = PasswordHasher(max_workers=1, max_queue=0)
+    saturated._in_flight = 1
+    monkeypatch.setattr(server, 'password_hasher', saturated)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.hash_password('senha'))
+    assert error.value.status_code == 503
+    assert error.value.headers == {'Retry-After': '1'}
+    saturated.shutdown()
@@ -0,0 +1,17 @@
+from post_counters import counter_keys
+
+
+def test_counter_keys_cover_type_and_categories():
+    keys = counter_keys({'type': 'need', 'category': 'food', 'categories': ['food', 'housing']})
+    assert sorted(keys) == sorted([
+        'total', 'type:need', 'primary_category:food', 'category:food', 'category:housing'
+    ])
+
+
+def test_counter_keys_without_categories():
+    assert counter_keys({'type': 'offer', 'categories': []}) == ['total', 'type:offer']
+
+
+def test_counter_keys_categories_only():
+    keys = counter_keys({'categories': ['work']})
+    assert sorted(keys) == ['category:work', 'total']
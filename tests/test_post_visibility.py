@@ -0,0 +1,61 @@
+"""
+Equivalência entre a regra antiga de visibilidade (loop em Python depois do find) e o filtro
+need_visibility_filter executado no MongoDB, sobre um conjunto de posts gerado
+"""
+
+import asyncio
+import itertools
+import random
+
+CATEGORIES = ['food', 'housing', 'work', 'legal', 'health']
+ROLES = ['migrant', 'volunteer', 'helper', 'admin']
+
+
+def old_visible(role: str, help_categories: list, post: dict) -> bool:
+    """Regra removida de get_posts (categories vazio/ausente vira [category])"""
+    if role not in ['volunteer', 'helper'] or post.get('type') != 'need':
+        return True
+    categories = post.get('categories') or ([post['category']] if post.get('category') else [])
+    return not help_categories or any(cat in help_categories for cat in categories)
+
+
+def generate_posts(count: int, seed: int = 8) -> list:
+    rng = random.Random(seed)
+    posts = []
+    for i in range(count):
+        post = {'id': str(i)}
+        post_type = rng.choice(['need', 'offer', None])
+        if post_type:
+            post['type'] = post_type
+        category = rng.choice(CATEGORIES + [None, 'missing'])
+        if category != 'missing':
+            post['category'] = category
+        categories = rng.choice(['missing', None, [], 'sample'])
+        if categories == 'sample':
+            post['categories'] = rng.sample(CATEGORIES, rng.randint(1, 3))
+        elif categories != 'missing':
+            post['categories'] = categories
+        posts.append(post)
+    return posts
+
+
+def test_need_visibility_filter_matches_old_rule(mongo_database):
+    from server import need_visibility_filter
+
+    posts = generate_posts(2000)
+    users = [(role, list(help_categories)) for role in ROLES
+             for size in range(3) for help_categories in itertools.combinations(CATEGORIES, size)]
+
+    async def compare():
+        async with mongo_database('test_visibility') as db:
+            await db.posts.insert_many([dict(post) for post in posts])
+            mismatches = []
+            for role, help_categories in users:
+                query = need_visibility_filter(role, help_categories) or {}
+                found = {doc['id'] async for doc in db.posts.find(query, {'id': 1})}
+                expected = {post['id'] for post in posts if old_visible(role, help_categories, post)}
+                if found != expected:
+                    mismatches.append((role, help_categories, sorted(found ^ expected)[:5]))
+            return mismatches
+
+    assert asyncio.run(compare()) == []
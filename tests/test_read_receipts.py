@@ -0,0 +1,63 @@
+import asyncio
+import uuid
+
+import pytest
+
+from conversations import record_messages
+from read_receipts import ReadReceiptBuffer
+
+
+def test_marks_are_coalesced_into_one_write_per_conversation(fake_db):
+    buffer = ReadReceiptBuffer()
+    buffer.mark('u1', 'u2', '2024-01-01T10:00:00')
+    buffer.mark('u1', 'u2', '2024-01-01T12:00:00')
+    buffer.mark('u1', 'u2', '2024-01-01T11:00:00')
+    buffer.mark('u1', 'u3', '2024-01-01T09:00:00')
+
+    flushed = []
+
+    async def on_flushed(user_id, partner_id, read_until):
+        flushed.append((user_id, partner_id, read_until))
+
+    assert asyncio.run(buffer.flush(fake_db, on_flushed)) == 2
+    assert len(fake_db.conversations.bulk_writes) == 1
+    assert sorted(flushed) == [('u1', 'u2', '2024-01-01T12:00:00'), ('u1', 'u3', '2024-01-01T09:00:00')]
+    assert buffer.stats() == {'pending': 0, 'marked': 4, 'flushed': 2}
+
+
+def test_failed_flush_keeps_marks_for_retry(fake_db):
+    fake_db.conversations.fail = True
+    buffer = ReadReceiptBuffer()
+    buffer.mark('u1', 'u2', '2024-01-01T10:00:00')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(buffer.flush(fake_db))
+    buffer.mark('u1', 'u2', '2024-01-01T09:00:00')
+
+    assert buffer._pending == {('u1', 'u2'): '2024-01-01T10:00:00'}
+    assert buffer.marked == 2
+
+
+def test_reply_before_flush_still_clears_unread(mongo_database):
+    def message(sender, recipient, created_at):
+        return {'id': str(uuid.uuid4()), 'from_user_id': sender, 'to_user_id': recipient,
+                'message': 'oi', 'created_at': created_at}
+
+    async def scenario():
+        async with mongo_database('test_read_receipts') as db:
+            buffer = ReadReceiptBuffer()
+            await record_messages(db, [message('a', 'b', '2024-01-01T10:00:00')])
+            # b lê a mensagem e responde antes do flush
+            buffer.mark('b', 'a', '2024-01-01T10:00:00')
+            await record_messages(db, [message('b', 'a', '2024-01-01T10:01:00')])
+            await buffer.flush(db)
+            replied = await db.conversations.find_one({'user_id': 'b', 'partner_id': 'a'})
+
+            # Mensagem recebida depois do que foi lido continua não lida
+            await record_messages(db, [message('a', 'b', '2024-01-01T10:02:00')])
+            buffer.mark('b', 'a', '2024-01-01T10:01:30')
+            await buffer.flush(db)
+            newer = await db.conversations.find_one({'user_id': 'b', 'partner_id': 'a'})
+            return replied['unread_count'], newer['unread_count']
+
+    assert asyncio.run(scenario()) == (0, 1)
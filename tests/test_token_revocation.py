@@ -0,0 +1,30 @@
+from token_revocation import REVOKE_ALL, RevokedTokenVersions
+
+
+def test_token_version_revokes_access_and_refresh_tokens():
+    revoked = RevokedTokenVersions()
+    revoked._min_versions['u1'] = 2
+
+    assert revoked.is_revoked('u1', 1, 0)
+    assert revoked.is_revoked('u1', 1)
+    assert not revoked.is_revoked('u1', 2, 0)
+    assert not revoked.is_revoked('u2', 0, 0)
+
+
+def test_claims_version_revokes_only_access_tokens():
+    revoked = RevokedTokenVersions()
+    revoked._min_claims_versions['u1'] = 1
+
+    # Access token emitido antes da troca de role
+    assert revoked.is_revoked('u1', 0, 0)
+    # Access token novo, emitido pelo /auth/refresh
+    assert not revoked.is_revoked('u1', 0, 1)
+    # Refresh token: não carrega claims_version
+    assert not revoked.is_revoked('u1', 0)
+
+
+def test_revoke_all_blocks_every_version():
+    revoked = RevokedTokenVersions()
+    revoked._min_versions['u1'] = REVOKE_ALL
+
+    assert revoked.is_revoked('u1', 10 ** 6, 10 ** 6)
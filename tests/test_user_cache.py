@@ -0,0 +1,54 @@
+import user_cache
+from user_cache import UserCache
+
+
+def test_hit_and_miss_counters():
+    cache = UserCache()
+    assert cache.get('u1') is None
+    cache.set('u1', {'id': 'u1'})
+    assert cache.get('u1') == {'id': 'u1'}
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache = UserCache(max_size=2)
+    cache.set('u1', 1)
+    cache.set('u2', 2)
+    cache.get('u1')
+    cache.set('u3', 3)
+
+    assert cache.get('u2') is None
+    assert cache.get('u1') == 1
+    assert cache.evictions == 1
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(user_cache.time, 'monotonic', lambda: now[0])
+    cache = UserCache(ttl_seconds=60)
+    cache.set('u1', 1)
+
+    now[0] += 61
+    assert cache.get('u1') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_invalidate_removes_entry():
+    cache = UserCache()
+    cache.set('u1', 1)
+    cache.invalidate('u1')
+    assert cache.get('u1') is None
+
+
+def test_entry_with_other_version_is_a_miss():
+    cache = UserCache()
+    cache.set('u1', {'role': 'admin'}, version=0)
+
+    # Token emitido depois de uma troca de role (claims_version 1) não usa a entrada antiga
+    assert cache.get('u1', 1) is None
+    assert cache.stats()['size'] == 0
+
+    cache.set('u1', {'role': 'migrant'}, version=1)
+    assert cache.get('u1', 1) == {'role': 'migrant'}
+    assert cache.get('u1') == {'role': 'migrant'}